@@ -0,0 +1,252 @@
+"""Serves getBasicAnnotations over HTTP from warm detector processes.
+
+POST JSONL documents to /annotate and the same documents come back, one per
+line and in order, with their "annotations" as autoannotate.py writes them.
+Documents of concurrent requests are gathered into batches for the workers,
+so the interpreter start-up and the detector set-up are paid once.
+
+    python3 annotate_server.py --port 8765 --workers 4
+    curl --data-binary @docs.jsonl http://127.0.0.1:8765/annotate
+"""
+import argparse
+import asyncio
+import json
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from autoannotate import (
+    DETECTOR_TIME_BUDGET, TAG_PRIORITY, Resolution, annotateLine,
+    useDetectorAlarm, warmDetectors,
+)
+
+MAX_BODY = 256 << 20
+
+_options = None
+
+
+def _initWorker(options):
+    global _options
+    _options = options
+    useDetectorAlarm()
+    warmDetectors()
+
+
+def annotateLines(lines):
+    """(error, annotated line) for every line; error is None on success."""
+    resolution, budget = _options
+    results = []
+    for line in lines:
+        try:
+            results.append((None, annotateLine(line, None, resolution, None,
+                                               budget)))
+        except Exception as e:
+            # Only the request the document came with fails.
+            results.append((f"{type(e).__name__}: {e}", None))
+    return results
+
+
+class Batcher:
+    """Gathers the documents of concurrent requests into worker batches.
+
+    A batch is sent once it holds batch_size documents or its first
+    document has waited batch_wait seconds, whichever comes first.
+    """
+
+    def __init__(self, pool, batch_size, batch_wait, in_flight):
+        self.pool = pool
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.queue = asyncio.Queue()
+        self.slots = asyncio.Semaphore(in_flight)
+        self.sending = set()
+
+    async def annotate(self, lines):
+        futures = []
+        loop = asyncio.get_running_loop()
+        for line in lines:
+            future = loop.create_future()
+            self.queue.put_nowait((line, future))
+            futures.append(future)
+        # A failed batch fails its futures with the executor's exception,
+        # which the caller gets back in place of the results.
+        return await asyncio.gather(*futures, return_exceptions=True)
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.batch_wait
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self.slots.acquire()
+            task = asyncio.create_task(self._send(batch))
+            self.sending.add(task)
+            task.add_done_callback(self.sending.discard)
+
+    async def _send(self, batch):
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(
+                self.pool, annotateLines, [line for line, _ in batch]
+            )
+        except Exception as e:
+            # e.g. BrokenProcessPool: no document of the batch was annotated.
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self.slots.release()
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+
+async def readRequest(reader):
+    """(method, path, keep_alive, body) of the next request, or None at EOF."""
+    request_line = await reader.readline()
+    if not request_line.strip():
+        return None
+    method, path, version = request_line.decode("latin-1").split()
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get("content-length", 0))
+    if length > MAX_BODY:
+        raise ValueError("request body too large")
+    body = await reader.readexactly(length) if length else b""
+    keep_alive = version == "HTTP/1.1" and headers.get("connection") != "close"
+    return method, path, keep_alive, body
+
+
+def response(status, body, content_type="application/x-ndjson", keep_alive=True):
+    reason = {200: "OK", 400: "Bad Request", 404: "Not Found",
+              405: "Method Not Allowed", 500: "Internal Server Error"}[status]
+    head = (f"HTTP/1.1 {status} {reason}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode("latin-1") + body
+
+
+def serverError(e):
+    print(f"Internal error: {type(e).__name__}: {e}", file=sys.stderr,
+          flush=True)
+    return 500, f"{type(e).__name__}: {e}\n".encode(), "text/plain"
+
+
+async def handle(batcher, method, path, body):
+    if path == "/health":
+        return 200, b"ok\n", "text/plain"
+    if path != "/annotate":
+        return 404, b"not found\n", "text/plain"
+    if method != "POST":
+        return 405, b"POST JSONL documents to /annotate\n", "text/plain"
+    try:
+        lines = [line for line in body.decode("utf-8").splitlines()
+                 if line.strip()]
+    except UnicodeDecodeError as e:
+        return 400, f"{e}\n".encode(), "text/plain"
+    results = await batcher.annotate(lines)
+    for result in results:
+        if isinstance(result, Exception):
+            return serverError(result)
+    for number, (error, _) in enumerate(results, 1):
+        if error is not None:
+            message = json.dumps({"line": number, "error": error}) + "\n"
+            return 400, message.encode(), "application/json"
+    annotated = "".join(line for _, line in results)
+    return 200, annotated.encode("utf-8"), "application/x-ndjson"
+
+
+async def serveConnection(batcher, reader, writer):
+    try:
+        while True:
+            try:
+                request = await readRequest(reader)
+            except (ValueError, asyncio.IncompleteReadError) as e:
+                writer.write(response(400, f"{e}\n".encode(), "text/plain",
+                                      keep_alive=False))
+                break
+            if request is None:
+                break
+            method, path, keep_alive, body = request
+            try:
+                status, body, content_type = await handle(batcher, method,
+                                                          path, body)
+            except Exception as e:
+                status, body, content_type = serverError(e)
+            writer.write(response(status, body, content_type, keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                break
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(args):
+    resolution = None
+    if args.resolve:
+        resolution = Resolution(args.resolve, args.tag_priority.upper().split(","))
+    options = (resolution, args.time_budget or None)
+
+    # Workers forked from here inherit the warm detectors.
+    warmDetectors()
+    with ProcessPoolExecutor(args.workers, initializer=_initWorker,
+                             initargs=(options,)) as pool:
+        batcher = Batcher(pool, args.batch_size, args.batch_wait / 1000,
+                          2 * args.workers)
+        batching = asyncio.create_task(batcher.run())
+        server = await asyncio.start_server(
+            lambda r, w: serveConnection(batcher, r, w), args.host, args.port
+        )
+        print(f"Serving on http://{args.host}:{args.port}/annotate", flush=True)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batching.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=2,
+                        help="Processes annotating documents")
+    parser.add_argument("--batch-size", type=int, default=64,
+                        help="Documents sent to a worker at a time")
+    parser.add_argument("--batch-wait", type=float, default=2.0,
+                        help="Milliseconds a document may wait for a batch "
+                             "to fill")
+    parser.add_argument("--resolve", choices=["longest", "priority"],
+                        help="Drop overlapping spans, keeping the longest or "
+                             "the highest priority tag.")
+    parser.add_argument("--tag-priority", default=",".join(TAG_PRIORITY),
+                        help="Comma separated tags, highest priority first.")
+    parser.add_argument("--time-budget", type=float,
+                        default=DETECTOR_TIME_BUDGET,
+                        help="Seconds a detector may spend on a document, "
+                             "per 256K characters of a longer one; 0 disables "
+                             "it.")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
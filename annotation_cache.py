@@ -0,0 +1,63 @@
+import hashlib
+import json
+import sqlite3
+
+
+def hashText(raw_txt):
+    return hashlib.sha256(raw_txt.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+class AnnotationCache:
+    """Detector matches keyed by a hash of raw_text, persisted in SQLite.
+
+    Every row records the fingerprint of the detector that produced it, so a
+    changed detector only invalidates its own rows.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.pending = []
+        self._conn = sqlite3.connect(path, timeout=60)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS matches ("
+            " text_hash TEXT NOT NULL,"
+            " detector TEXT NOT NULL,"
+            " fingerprint TEXT NOT NULL,"
+            " matches TEXT NOT NULL,"
+            " PRIMARY KEY (text_hash, detector))"
+        )
+        self._conn.commit()
+
+    def lookup(self, text_hash):
+        rows = self._conn.execute(
+            "SELECT detector, fingerprint, matches FROM matches WHERE text_hash = ?",
+            (text_hash,),
+        )
+        return {
+            detector: (fingerprint, [tuple(m) for m in json.loads(matches)])
+            for detector, fingerprint, matches in rows
+        }
+
+    def store(self, text_hash, detector, fingerprint, matches):
+        self.pending.append(
+            (text_hash, detector, fingerprint,
+             json.dumps(matches, separators=(",", ":")))
+        )
+
+    def takePending(self):
+        rows, self.pending = self.pending, []
+        return rows
+
+    def commit(self, rows=None):
+        if rows is None:
+            rows = self.takePending()
+        if not rows:
+            return
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO matches VALUES (?, ?, ?, ?)", rows
+            )
+
+    def close(self):
+        self.commit()
+        self._conn.close()
@@ -1,90 +1,153 @@
 import argparse
+import hashlib
 import json
 import os
 import re
-from readchar import readchar
+import shutil
+import signal
+import tempfile
+import time
+import warnings
+from bisect import bisect_left
+from collections import Counter, defaultdict, deque, namedtuple
+from operator import attrgetter
+from itertools import combinations, islice
+from contextlib import contextmanager
+from json.encoder import encode_basestring_ascii
 
+from annotation_cache import AnnotationCache, hashText
+from detector_profile import DetectorProfile
+from document_index import DecisionLog, DocumentIndex
+from dictionary_matcher import DictionaryMatcher, hashWordList, loadWordList
 
-def getSpans(pattern, raw_txt, tag):
-    spans = []
-    indexes = [
-        (i.start(), i.end()) for i in re.finditer(pattern, raw_txt, flags=re.IGNORECASE)
-    ]
-    for t in indexes:
-        ne = {}
-        ne["start"] = t[0]
-        ne["end"] = t[1]
-        ne["tag"] = tag
-        ne["extent"] = raw_txt[t[0] : t[1]]
-        spans.append(ne)
-    return spans
+HERE = os.path.dirname(os.path.abspath(__file__))
+NAMES_FILE = os.path.join(HERE, "names_file")
+# Compiled from NAMES_FILE by create_name_regex.py / update_names.py.
+NAMES_ARTIFACT = os.path.join(HERE, "names.dict")
 
 
-def getGenderAnnotations(raw_txt):
-    annotations = []
-    gender_words = [
-        "lord",
-        "lady",
-        "sir",
-        "maam",
-        "ma'am",
-        "madam",
-        "he",
-        "her",
-        "she",
-        "his",
-        "him",
-        "man",
-        "woman",
-        "men",
-        "women",
-        "mr",
-        "mrs",
-        "brother",
-        "sister",
-        "wife",
-        "husband",
-        "uncle",
-        "male",
-        "female",
-        "son",
-        "daughter",
-        "father",
-        "mother",
-        "king",
-        "queen",
-        "himself",
-        "herself",
-        "motherhood",
-        "fatherhood",
-        "bitch",
-        "manhood",
-        "womanhood",
-    ]
+class LazyPattern:
+    """A regex compiled on first use rather than at import.
 
-    for gender in set(gender_words):
-        annotations.extend(getSpans(r"\b" + gender + r"\b", raw_txt, "GENDER"))
+    Other attributes are those of the compiled pattern.
+    """
 
-    return annotations
+    __slots__ = ("source", "_flags", "_pattern")
 
-def getUnameAnnotations(raw_txt):
-    annotations = []
-    words = [
-        'kaxil',
-        'ctr',
-        'bhuvan',
-        'vagrant'
-    ]
+    def __init__(self, source, flags=0):
+        self.source = source
+        self._flags = flags
+        self._pattern = None
 
-    for gender in set(words):
-        annotations.extend(getSpans(r"\b" + gender + r"\b", raw_txt, "USERNAME"))
+    def compile(self):
+        if self._pattern is None:
+            self._pattern = re.compile(self.source, self._flags)
+        return self._pattern
 
-    return annotations
+    def __getattr__(self, name):
+        return getattr(self.compile(), name)
 
 
-def getTimeSpans(raw_txt):
-    spans = []
+def loadNameMatcher():
+    # names.dict is only used while it matches names_file; after a hand edit
+    # of names_file the matcher is built from it until names.dict is rebuilt.
+    if not os.path.exists(NAMES_ARTIFACT):
+        return DictionaryMatcher(loadWordList(NAMES_FILE))
+    try:
+        matcher = DictionaryMatcher.load(NAMES_ARTIFACT)
+    except ValueError as e:
+        warnings.warn(f"{e}; using {NAMES_FILE} instead")
+        return DictionaryMatcher(loadWordList(NAMES_FILE))
+    if not os.path.exists(NAMES_FILE) or (
+        matcher.source_hash == hashWordList(NAMES_FILE)
+    ):
+        return matcher
+    warnings.warn(f"{NAMES_ARTIFACT} was not built from the current "
+                  f"{NAMES_FILE}, which is used instead; rebuild it with "
+                  "create_name_regex.py")
+    return DictionaryMatcher(loadWordList(NAMES_FILE))
+
+
+_matchers = {}
+
+
+def _matcher(name):
+    # Automata are built once per process, on first use.
+    if name not in _matchers:
+        if name == "GENDER":
+            matcher = DictionaryMatcher(GENDER_WORDS)
+        elif name == "USERNAME":
+            matcher = DictionaryMatcher(USERNAME_WORDS)
+        elif name == "STATE":
+            matcher = DictionaryMatcher(STATE_NAMES, word_end=False)
+        elif name == "COUNTRY":
+            matcher = DictionaryMatcher(COUNTRY_NAMES, whitespace=True)
+        elif name == "NAME":
+            matcher = loadNameMatcher()
+        else:
+            raise KeyError(name)
+        _matchers[name] = matcher
+    return _matchers[name]
+
+
+GENDER_WORDS = [
+    "lord",
+    "lady",
+    "sir",
+    "maam",
+    "ma'am",
+    "madam",
+    "he",
+    "her",
+    "she",
+    "his",
+    "him",
+    "man",
+    "woman",
+    "men",
+    "women",
+    "mr",
+    "mrs",
+    "brother",
+    "sister",
+    "wife",
+    "husband",
+    "uncle",
+    "male",
+    "female",
+    "son",
+    "daughter",
+    "father",
+    "mother",
+    "king",
+    "queen",
+    "himself",
+    "herself",
+    "motherhood",
+    "fatherhood",
+    "bitch",
+    "manhood",
+    "womanhood",
+]
 
+
+def getGenderAnnotations(raw_txt):
+    return runDetector(DETECTORS_BY_NAME["GENDER"], raw_txt)
+
+
+USERNAME_WORDS = [
+    'kaxil',
+    'ctr',
+    'bhuvan',
+    'vagrant'
+]
+
+
+def getUnameAnnotations(raw_txt):
+    return runDetector(DETECTORS_BY_NAME["USERNAME"], raw_txt)
+
+
+def _timePatterns():
     hour = r'([0-1]?[0-9]|2[0-3])'
     minutes = r'([0-5][0-9])'
     seconds = r'([0-5][0-9])'
@@ -102,30 +165,26 @@ def getTimeSpans(raw_txt):
     formats.append(r'\b'+hour+r':'+minutes+r':'+seconds+r'\b')
     formats.append(r'\b'+hour+r'[\.\-\s]'+suffix+r'\b')
 
-    patterns = [
-        '|'.join(formats),
-        r'\b1[3-7]\d{11}\b'  # for epoch timestamp
+    return [
+        LazyPattern('|'.join(formats), flags=re.IGNORECASE),
+        LazyPattern(r'\b1[3-7]\d{11}\b', flags=re.IGNORECASE)  # for epoch timestamp
     ]
 
-    for pattern in patterns:
-        indexes = [
-            (i.start(), i.end()) for i in re.finditer(pattern, raw_txt, flags=re.IGNORECASE)
-        ]
-        for t in indexes:
-            ne = {"properties": {"DATE-TIME-SUBTYPE": "TIME"}}
-            ne["start"] = t[0]
-            ne["end"] = t[1]
-            ne["tag"] = "DATE-TIME"
-            ne["extent"] = raw_txt[t[0] : t[1]]
-            spans.append(ne)
-    return spans
 
+TIME_PATTERNS = _timePatterns()
 
-def getDateSpans(raw_txt):
-    spans = []
 
-    week_day = r"((mon|tues?|wed(nes?)|thu(rs)?|fri|sat(ur)?|sun)(day)?)"
-    month = r"((jan|febr?)(uary)?|mar(ch)?|apr(il)?|may|june?|july?|aug(ust)?|sept?(ember)?|oct(ober)?|nov(ember)?|dec(ember)?)"
+def getTimeSpans(raw_txt):
+    return runDetector(DETECTORS_BY_NAME["TIME"], raw_txt)
+
+
+WEEK_DAY = r"((mon|tues?|wed(nes?)|thu(rs)?|fri|sat(ur)?|sun)(day)?)"
+MONTH = r"((jan|febr?)(uary)?|mar(ch)?|apr(il)?|may|june?|july?|aug(ust)?|sept?(ember)?|oct(ober)?|nov(ember)?|dec(ember)?)"
+
+
+def _datePattern():
+    week_day = WEEK_DAY
+    month = MONTH
     month_digits = r"(0?[1-9]|1[012])"
     day = r"((0[1-9]|[12]\d|3[01])|([1-9]|[12]\d|3[01]))"
     year_small_digits = r"(\d\d)"
@@ -153,326 +212,826 @@ def getDateSpans(raw_txt):
     formats.append(r'\b'+year_large+r'\s*((to)|\-|(and))\s*'+year_large+r'\b')
     # formats.append(year_small)
 
-    pattern = '|'.join(formats)
+    return LazyPattern('|'.join(formats), flags=re.IGNORECASE)
 
-    indexes = [
-        (i.start(), i.end()) for i in re.finditer(pattern, raw_txt, flags=re.IGNORECASE)
-    ]
-    for t in indexes:
-        ne = {"properties": {"DATE-TIME-SUBTYPE": "DATE"}}
-        ne["start"] = t[0]
-        ne["end"] = t[1]
-        ne["tag"] = "DATE-TIME"
-        ne["extent"] = raw_txt[t[0] : t[1]]
-        spans.append(ne)
-    return spans
+
+DATE_PATTERN = _datePattern()
+
+
+def getDateSpans(raw_txt):
+    return runDetector(DETECTORS_BY_NAME["DATE"], raw_txt)
+
+
+STATE_NAMES = [
+    "Alabama",
+    "Alaska",
+    "American Samoa",
+    "Arizona",
+    "Arkansas",
+    "California",
+    "Colorado",
+    "Connecticut",
+    "Delaware",
+    "District Of Columbia",
+    "Federated States Of Micronesia",
+    "Florida",
+    "Georgia",
+    "Guam",
+    "Hawaii",
+    "Idaho",
+    "Illinois",
+    "Indiana",
+    "Iowa",
+    "Kansas",
+    "Kentucky",
+    "Louisiana",
+    "Maine",
+    "Marshall Islands",
+    "Maryland",
+    "Massachusetts",
+    "Michigan",
+    "Minnesota",
+    "Mississippi",
+    "Missouri",
+    "Montana",
+    "Nebraska",
+    "Nevada",
+    "New Hampshire",
+    "New Jersey",
+    "New Mexico",
+    "New York",
+    "North Carolina",
+    "North Dakota",
+    "Northern Mariana Islands",
+    "Ohio",
+    "Oklahoma",
+    "Oregon",
+    "Palau",
+    "Pennsylvania",
+    "Puerto Rico",
+    "Rhode Island",
+    "South Carolina",
+    "South Dakota",
+    "Tennessee",
+    "Texas",
+    "Utah",
+    "Vermont",
+    "Virgin Islands",
+    "Virginia",
+    "Washington",
+    "West Virginia",
+    "Wisconsin",
+    "Wyoming",
+]
 
 
 def getStateSpans(raw_txt):
-    list_states = [r'\bAlabama',r'\bAlaska',r'\bAmerican Samoa',r'\bArizona',r'\bArkansas',r'\bCalifornia',r'\bColorado',r'\bConnecticut',r'\bDelaware',r'\bDistrict Of Columbia',r'\bFederated States Of Micronesia',r'\bFlorida',r'\bGeorgia',r'\bGuam',r'\bHawaii',r'\bIdaho',r'\bIllinois',r'\bIndiana',r'\bIowa',r'\bKansas',r'\bKentucky',r'\bLouisiana',r'\bMaine',r'\bMarshall Islands',r'\bMaryland',r'\bMassachusetts',r'\bMichigan',r'\bMinnesota',r'\bMississippi',r'\bMissouri',r'\bMontana',r'\bNebraska',r'\bNevada',r'\bNew Hampshire',r'\bNew Jersey',r'\bNew Mexico',r'\bNew York',r'\bNorth Carolina',r'\bNorth Dakota',r'\bNorthern Mariana Islands',r'\bOhio',r'\bOklahoma',r'\bOregon',r'\bPalau',r'\bPennsylvania',r'\bPuerto Rico',r'\bRhode Island',r'\bSouth Carolina',r'\bSouth Dakota',r'\bTennessee',r'\bTexas',r'\bUtah',r'\bVermont',r'\bVirgin Islands',r'\bVirginia',r'\bWashington',r'\bWest Virginia',r'\bWisconsin',r'\bWyoming']
+    return runDetector(DETECTORS_BY_NAME["STATE"], raw_txt)
+
+
+# A URL is a scheme, "www." or "host.tld//" prefix followed by characters and
+# balanced parentheses, not ending in punctuation. Quantifiers are possessive
+# so that matching stays linear in the length of the text; hosts before "//"
+# are capped at the 253 characters DNS allows for the same reason.
+_URL_CHAR = r"[^\s()<>\\]"
+_URL_END_CHAR = r"""[^\s`!()\[\]{};:'".,<>\\?«»“”‘’]"""
+_URL_PUNCT = r"""[`!\[\]{};:'".,?«»“”‘’]"""
+_URL_PARENS = rf"\((?:{_URL_CHAR}++|\({_URL_CHAR}++\))*+\)"
+_URL_HOST = r"[a-z0-9.\-]{1,253}+"
+URL_PATTERN = LazyPattern(
+    r"\b(?:https?://|www\d{0,3}[.]"
+    rf"|(?:(?=[a-z0-9.\-]{{4}}){_URL_HOST}(?<=[.][a-z]{{2}})"
+    rf"|(?=[a-z0-9.\-]{{5}}){_URL_HOST}(?<=[.][a-z]{{3}})"
+    rf"|(?=[a-z0-9.\-]{{6}}){_URL_HOST}(?<=[.][a-z]{{4}}))//)"
+    rf"(?:{_URL_CHAR}|{_URL_PARENS})"
+    rf"(?:{_URL_PUNCT}*+(?:{_URL_PARENS}|{_URL_END_CHAR}))++",
+    flags=re.IGNORECASE,
+)
 
-    spans = []
-    for pattern in list_states:
-        indexes = [
-            (i.start(), i.end())
-            for i in re.finditer(pattern, raw_txt, flags=re.IGNORECASE)
-        ]
-        for t in indexes:
-            entity = {"properties": {"ADDRESS-SUBTYPE": ["STATE"]}}
-            entity["start"] = t[0]
-            entity["end"] = t[1]
-            entity["tag"] = "ADDRESS"
-            entity["extent"] = raw_txt[t[0] : t[1]]
-            spans.append(entity)
-    return spans
 
 def getURLSpans(raw_txt):
-    pattern = r"(?i)\b((?:https?://|www\d{0,3}[.]|[a-z0-9.\-]+[.][a-z]{2,4}//)(?:[^\s()<>\\]+|\(([^\s()<>\\]+|(\([^\s()<>\\]+\)))*\))+(?:\(([^\s()<>\\]+|(\([^\s()<>\\]+\)))*\)|[^\s`!()\[\]{};:'\".,<>\\?«»“”‘’]))"
-    spans = []
-    indexes = [
-        (i.start(), i.end())
-        for i in re.finditer(pattern, raw_txt, flags=re.IGNORECASE)
-    ]
-    for t in indexes:
-        entity = {}
-        entity["start"] = t[0]
-        entity["end"] = t[1]
-        entity["tag"] = "URL"
-        entity["extent"] = raw_txt[t[0] : t[1]]
-        spans.append(entity)
-    return spans
+    return runDetector(DETECTORS_BY_NAME["URL"], raw_txt)
+
+
+COUNTRY_NAMES = [
+    "Afghanistan",
+    "Albania",
+    "Algeria",
+    "America",
+    "Andorra",
+    "Angola",
+    "Antigua & Deps",
+    "Argentina",
+    "Armenia",
+    "Australia",
+    "Austria",
+    "Azerbaijan",
+    "Bahamas",
+    "Bahrain",
+    "Bangladesh",
+    "Barbados",
+    "Belarus",
+    "Belgium",
+    "Belize",
+    "Benin",
+    "Bhutan",
+    "Bolivia",
+    "Bosnia Herzegovina",
+    "Botswana",
+    "Brazil",
+    "britain",
+    "Brunei",
+    "Bulgaria",
+    "Burkina",
+    "Burundi",
+    "Cambodia",
+    "Cameroon",
+    "Canada",
+    "Cape Verde",
+    "Central African Rep",
+    "Chad",
+    "Chile",
+    "China",
+    "Colombia",
+    "Comoros",
+    "Congo",
+    "Congo",
+    "Costa Rica",
+    "Croatia",
+    "Cuba",
+    "Cyprus",
+    "Czech Republic",
+    "Denmark",
+    "Djibouti",
+    "Dominica",
+    "Dominican Republic",
+    "East Timor",
+    "Ecuador",
+    "Egypt",
+    "El Salvador",
+    "Equatorial Guinea",
+    "Eritrea",
+    "Estonia",
+    "Ethiopia",
+    "Fiji",
+    "Finland",
+    "France",
+    "Gabon",
+    "Gambia",
+    "Georgia",
+    "Germany",
+    "Ghana",
+    "Greece",
+    "Grenada",
+    "Guatemala",
+    "Guinea",
+    "Guinea-Bissau",
+    "Guyana",
+    "Haiti",
+    "Honduras",
+    "Hungary",
+    "Iceland",
+    "India",
+    "Indonesia",
+    "Iran",
+    "Iraq",
+    "Ireland",
+    "Israel",
+    "Italy",
+    "Ivory Coast",
+    "Jamaica",
+    "Japan",
+    "Jordan",
+    "Kazakhstan",
+    "Kenya",
+    "Kiribati",
+    "Korea North",
+    "Korea South",
+    "Kosovo",
+    "Kuwait",
+    "Kyrgyzstan",
+    "Laos",
+    "Latvia",
+    "Lebanon",
+    "Lesotho",
+    "Liberia",
+    "Libya",
+    "Liechtenstein",
+    "Lithuania",
+    "Luxembourg",
+    "Macedonia",
+    "Madagascar",
+    "Malawi",
+    "Malaysia",
+    "Maldives",
+    "Mali",
+    "Malta",
+    "Marshall Islands",
+    "Mauritania",
+    "Mauritius",
+    "Mexico",
+    "Micronesia",
+    "Moldova",
+    "Monaco",
+    "Mongolia",
+    "Montenegro",
+    "Morocco",
+    "Mozambique",
+    "Myanmar",
+    "Namibia",
+    "Nauru",
+    "Nepal",
+    "Netherlands",
+    "New Zealand",
+    "Nicaragua",
+    "Niger",
+    "Nigeria",
+    "Norway",
+    "Oman",
+    "Pakistan",
+    "Palau",
+    "Panama",
+    "Papua New Guinea",
+    "Paraguay",
+    "Peru",
+    "Philippines",
+    "Poland",
+    "Portugal",
+    "Qatar",
+    "Romania",
+    "Russian Federation",
+    "Rwanda",
+    "St Kitts & Nevis",
+    "St Lucia",
+    "Saint Vincent & the Grenadines",
+    "Samoa",
+    "San Marino",
+    "Sao Tome & Principe",
+    "Saudi Arabia",
+    "Senegal",
+    "Serbia",
+    "Seychelles",
+    "Sierra Leone",
+    "Singapore",
+    "Slovakia",
+    "Slovenia",
+    "Solomon Islands",
+    "Somalia",
+    "South Africa",
+    "South Sudan",
+    "Spain",
+    "Sri Lanka",
+    "Sudan",
+    "Suriname",
+    "Swaziland",
+    "Sweden",
+    "Switzerland",
+    "Syria",
+    "Taiwan",
+    "Tajikistan",
+    "Tanzania",
+    "Thailand",
+    "Togo",
+    "Tonga",
+    "Trinidad & Tobago",
+    "Tunisia",
+    "Turkey",
+    "Turkmenistan",
+    "Tuvalu",
+    "Uganda",
+    "Ukraine",
+    "United Arab Emirates",
+    "United Kingdom",
+    "United States",
+    "Uruguay",
+    "Uzbekistan",
+    "Vanuatu",
+    "Vatican City",
+    "Venezuela",
+    "Vietnam",
+    "Yemen",
+    "Zambia",
+    "Zimbabwe",
+]
+COUNTRY_PATTERNS = [
+    LazyPattern(r"\bU\.?A\.?E\.?\b", flags=re.IGNORECASE),
+    LazyPattern(r"\bU\.?K\.?\b", flags=re.IGNORECASE),
+    LazyPattern(r"\bu[\s.]*s\.?\b", flags=re.IGNORECASE),
+]
+
 
 def getCountrySpans(raw_txt):
-    list_countries = [
-        r"\bAfghanistan\b",
-        r"\bAlbania\b",
-        r"\bAlgeria\b",
-        r"\bAmerica\b",
-        r"\bAndorra\b",
-        r"\bAngola\b",
-        r"\bAntigua\s&\sDeps\b",
-        r"\bArgentina\b",
-        r"\bArmenia\b",
-        r"\bAustralia\b",
-        r"\bAustria\b",
-        r"\bAzerbaijan\b",
-        r"\bBahamas\b",
-        r"\bBahrain\b",
-        r"\bBangladesh\b",
-        r"\bBarbados\b",
-        r"\bBelarus\b",
-        r"\bBelgium\b",
-        r"\bBelize\b",
-        r"\bBenin\b",
-        r"\bBhutan\b",
-        r"\bBolivia\b",
-        r"\bBosnia\sHerzegovina\b",
-        r"\bBotswana\b",
-        r"\bBrazil\b",
-        r"\bbritain\b",
-        r"\bBrunei\b",
-        r"\bBulgaria\b",
-        r"\bBurkina\b",
-        r"\bBurundi\b",
-        r"\bCambodia\b",
-        r"\bCameroon\b",
-        r"\bCanada\b",
-        r"\bCape\sVerde\b",
-        r"\bCentral\sAfrican\sRep\b",
-        r"\bChad\b",
-        r"\bChile\b",
-        r"\bChina\b",
-        r"\bColombia\b",
-        r"\bComoros\b",
-        r"\bCongo\b",
-        r"\bCongo\b",
-        r"\bCosta\sRica\b",
-        r"\bCroatia\b",
-        r"\bCuba\b",
-        r"\bCyprus\b",
-        r"\bCzech\sRepublic\b",
-        r"\bDenmark\b",
-        r"\bDjibouti\b",
-        r"\bDominica\b",
-        r"\bDominican\sRepublic\b",
-        r"\bEast\sTimor\b",
-        r"\bEcuador\b",
-        r"\bEgypt\b",
-        r"\bEl\sSalvador\b",
-        r"\bEquatorial\sGuinea\b",
-        r"\bEritrea\b",
-        r"\bEstonia\b",
-        r"\bEthiopia\b",
-        r"\bFiji\b",
-        r"\bFinland\b",
-        r"\bFrance\b",
-        r"\bGabon\b",
-        r"\bGambia\b",
-        r"\bGeorgia\b",
-        r"\bGermany\b",
-        r"\bGhana\b",
-        r"\bGreece\b",
-        r"\bGrenada\b",
-        r"\bGuatemala\b",
-        r"\bGuinea\b",
-        r"\bGuinea-Bissau\b",
-        r"\bGuyana\b",
-        r"\bHaiti\b",
-        r"\bHonduras\b",
-        r"\bHungary\b",
-        r"\bIceland\b",
-        r"\bIndia\b",
-        r"\bIndonesia\b",
-        r"\bIran\b",
-        r"\bIraq\b",
-        r"\bIreland\b",
-        r"\bIsrael\b",
-        r"\bItaly\b",
-        r"\bIvory\sCoast\b",
-        r"\bJamaica\b",
-        r"\bJapan\b",
-        r"\bJordan\b",
-        r"\bKazakhstan\b",
-        r"\bKenya\b",
-        r"\bKiribati\b",
-        r"\bKorea\sNorth\b",
-        r"\bKorea\sSouth\b",
-        r"\bKosovo\b",
-        r"\bKuwait\b",
-        r"\bKyrgyzstan\b",
-        r"\bLaos\b",
-        r"\bLatvia\b",
-        r"\bLebanon\b",
-        r"\bLesotho\b",
-        r"\bLiberia\b",
-        r"\bLibya\b",
-        r"\bLiechtenstein\b",
-        r"\bLithuania\b",
-        r"\bLuxembourg\b",
-        r"\bMacedonia\b",
-        r"\bMadagascar\b",
-        r"\bMalawi\b",
-        r"\bMalaysia\b",
-        r"\bMaldives\b",
-        r"\bMali\b",
-        r"\bMalta\b",
-        r"\bMarshall\sIslands\b",
-        r"\bMauritania\b",
-        r"\bMauritius\b",
-        r"\bMexico\b",
-        r"\bMicronesia\b",
-        r"\bMoldova\b",
-        r"\bMonaco\b",
-        r"\bMongolia\b",
-        r"\bMontenegro\b",
-        r"\bMorocco\b",
-        r"\bMozambique\b",
-        r"\bMyanmar\b",
-        r"\bNamibia\b",
-        r"\bNauru\b",
-        r"\bNepal\b",
-        r"\bNetherlands\b",
-        r"\bNew\sZealand\b",
-        r"\bNicaragua\b",
-        r"\bNiger\b",
-        r"\bNigeria\b",
-        r"\bNorway\b",
-        r"\bOman\b",
-        r"\bPakistan\b",
-        r"\bPalau\b",
-        r"\bPanama\b",
-        r"\bPapua\sNew\sGuinea\b",
-        r"\bParaguay\b",
-        r"\bPeru\b",
-        r"\bPhilippines\b",
-        r"\bPoland\b",
-        r"\bPortugal\b",
-        r"\bQatar\b",
-        r"\bRomania\b",
-        r"\bRussian\sFederation\b",
-        r"\bRwanda\b",
-        r"\bSt\sKitts\s&\sNevis\b",
-        r"\bSt\sLucia\b",
-        r"\bSaint\sVincent\s&\sthe\sGrenadines\b",
-        r"\bSamoa\b",
-        r"\bSan\sMarino\b",
-        r"\bSao\sTome\s&\sPrincipe\b",
-        r"\bSaudi\sArabia\b",
-        r"\bSenegal\b",
-        r"\bSerbia\b",
-        r"\bSeychelles\b",
-        r"\bSierra\sLeone\b",
-        r"\bSingapore\b",
-        r"\bSlovakia\b",
-        r"\bSlovenia\b",
-        r"\bSolomon\sIslands\b",
-        r"\bSomalia\b",
-        r"\bSouth\sAfrica\b",
-        r"\bSouth\sSudan\b",
-        r"\bSpain\b",
-        r"\bSri\sLanka\b",
-        r"\bSudan\b",
-        r"\bSuriname\b",
-        r"\bSwaziland\b",
-        r"\bSweden\b",
-        r"\bSwitzerland\b",
-        r"\bSyria\b",
-        r"\bTaiwan\b",
-        r"\bTajikistan\b",
-        r"\bTanzania\b",
-        r"\bThailand\b",
-        r"\bTogo\b",
-        r"\bTonga\b",
-        r"\bTrinidad\s&\sTobago\b",
-        r"\bTunisia\b",
-        r"\bTurkey\b",
-        r"\bTurkmenistan\b",
-        r"\bTuvalu\b",
-        r"\bUganda\b",
-        r"\bUkraine\b",
-        r"\bUnited\sArab\sEmirates\b",
-        r"\bU\.?A\.?E\.?\b",
-        r"\bUnited\sKingdom\b",
-        r"\bU\.?K\.?\b",
-        r"\bUnited\sStates\b",
-        r"\bu[\s.]*s\.?\b",
-        r"\bUruguay\b",
-        r"\bUzbekistan\b",
-        r"\bVanuatu\b",
-        r"\bVatican\sCity\b",
-        r"\bVenezuela\b",
-        r"\bVietnam\b",
-        r"\bYemen\b",
-        r"\bZambia\b",
-        r"\bZimbabwe\b",
-    ]
+    return runDetector(DETECTORS_BY_NAME["COUNTRY"], raw_txt)
 
-    spans = []
-    for pattern in list_countries:
-        indexes = [
-            (i.start(), i.end())
-            for i in re.finditer(pattern, raw_txt, flags=re.IGNORECASE)
-        ]
-        for t in indexes:
-            entity = {"properties": {"ADDRESS-SUBTYPE": ["COUNTRY"]}}
-            entity["start"] = t[0]
-            entity["end"] = t[1]
-            entity["tag"] = "ADDRESS"
-            entity["extent"] = raw_txt[t[0] : t[1]]
-            spans.append(entity)
-    return spans
+
+# Ten digits, each pair separated by at most a ".", a "-" or a run of
+# whitespace, and not part of a longer run of digits.
+PHONE_PATTERN = LazyPattern(r"(?<!\d)\d(?:(?:[.\-]|\s*+)\d){9}(?!\d)")
 
 
 def getPhoneSpans(raw_txt):
-    spans = []
-    pattern = r"\d(\.|\s*|\-)\d(\.|\s*|\-)\d(\.|\s*|\-)\d(\.|\s*|\-)\d(\.|\s*|\-)\d(\.|\s*|\-)\d(\.|\s*|\-)\d(\.|\s*|\-)\d(\.|\s*|\-)\d(\.|\s*|\-)"
-    indexes = [
-        (i.start(), i.end()) for i in re.finditer(pattern, raw_txt, flags=re.IGNORECASE)
-    ]
-    for t in indexes:
-        ne = {}
-        ne["start"] = t[0]
-        ne["end"] = t[1]
-        ne["tag"] = "PHONE"
-        ne["extent"] = raw_txt[t[0] : t[1]]
-        spans.append(ne)
-    return spans
+    return runDetector(DETECTORS_BY_NAME["PHONE"], raw_txt)
 
 
 def getNameSpans(raw_txt):
-    spans = []
-    pattern = r"\bshaykh al islam mohammed ibn 'abd al-wahhab al-tanaimi\b|\babdullah bin abdulaziz al-sa'ud\b|\blgustafson_karen cardiel, daisy\b|\bgustafson_karer cardiel, daisy\b|\bgustafson_karen cardiel, daisy\b|\bthomas-greenfield, linda(ms)\b|\baustin-ferguson, kathleen t\b|\bmohammed yussef el magariaf\b|\bvictor manuel rivera moreno\b|\bmullah abdul ghani baradar\b|\bmabrouk issa abu harroura\b|\bpatriarch mesrop mutafyan\b|\bchristopher m\. schnaubelt\b|\babdel hakim alamin belhaj\b|\bassuncao afonso dos anjos\b|\bluz elena guerrero guerra\b|\breverend deacon nektarios\b|\bcharles luoma-overstreet\b|\bjones-johnson, carolyn d\b|\bshaykh al islam mohammed\b|\bcardinal joachim meisner\b|\bthomas-greenfield, linda\b|\bmohammed yussef magariaf\b|\bsail al-islam al-qadhafi\b|\bk\.s\. sachidananda murthy\b|\bclaudia 'vette gonzalez\b|\bhrod17@clintonemail\.com\b|\bkhalifa belqasim hefter\b|\bclaudia lvette gonzalez\b|\bkhalifa belqasim haftar\b|\bdaniel patrick moynihan\b|\bclaudia !vette gonzalez\b|\bjean-berttrand aristide\b|\bmcmullen, christopher j\b|\babd al-wahhab al-tamimi\b|\bwilliam f\. buckley, jr\.\b|\bclaudia ivette gonzalez\b|\bpatriarch bartholomew i\b|\bkhalifa belgasim haftar\b|\blilia alejandra garcia\b|\bhillary rodham clinton\b|\bbarks-ruggles, erica 3\b|\barturo gonzalez rascon\b|\bmiguel angel jaramillo\b|\bchristopher schnaubelt\b|\bpatriarch, bartholomew\b|\bbernier-toth, michelle\b|\bmartin luther king jr\.\b|\btomlinson, christina b\b|\bjean-bertrand aristide\b|\bpatriarch bartholomeos\b|\bpatriarch vartholomew\b|\bgillis, christopher 3\b|\bmustafa kemal ataturk\b|\bsullivan, stephanie s\b|\balexis de tocqueville\b|\bslaughter, anne-marie\b|\boscar maynez grijalva\b|\belizabeth fitzsimmons\b|\babdulrahman ben yazza\b|\b\.kbdel rahman el-keib\b|\bmortimer b\. zuckerman\b|\banthony j\. limberakis\b|\bmohamed hosni mubarak\b|\bjean-robert lafortune\b|\babdulrahman ben yezza\b|\babd al-nasser shamata\b|\bsaif al-islam qaddafi\b|\bwillard cleon skousen\b|\bfitzgerald, william e\b|\bjane dammen mcauliffe\b|\bmalin, mary catherine\b|\banders fogh rasmussen\b|\bpatriarch bartholomew\b|\babdel rahman el-keib\b|\bpaulo espirito santo\b|\bklevorick, caitlin b\b|\bsolirnan abd al-qadr\b|\bsamuelson, heather f\b|\bstephanie l\. hallett\b|\bantonios trakatellis\b|\bjacqueline novogratz\b|\bkreab gavin anderson\b|\banne-marie slaughter\b|\bdwight d\. eisenhower\b|\bcrocker, bathsheba n\b|\bchas w\. freeman, jr\.\b|\brecep tayyip erdogan\b|\bdr\. allan e\. goodman\b|\bhallett, stephanie l\b|\bnelson w\. cunningham\b|\bmohammed al-magariaf\b|\brandolph, lawrence m\b|\bdavid m, satterfield\b|\bjames r\. stoner, jr\.\b|\bkennedy, j christian\b|\btomlinson, christina\b|\bjohn birks gillespie\b|\braghavan jagannathan\b|\bantonio munoz ortega\b|\byu\.ssef el magariaf\b|\byoussef al mangoush\b|\bdavid, jimmy carter\b|\bmuhammad al-gharabi\b|\bmuarnmar al qaddafi\b|\bmcdonough, denis r\.\b|\bgeoffroy, gregory l\b|\bhi i i ay ci i nton\b|\bchristina tomlinson\b|\bbrassanini, david g\b|\babdurrahirn el-keib\b|\bcecilia covarrubias\b|\bstevens mitt romnev\b|\bchristopher stevens\b|\bcie re m ccaski i i\b|\bfarooq khan leghari\b|\bmustafa abdul jalil\b|\bzulfikar ali bhutto\b|\bmceldowney, nancy e\b|\bmustafa abdel jalil\b|\bschlicher, ronald l\b|\bmahmoud ahmadinejad\b|\bgeraldine seruyange\b|\bchartrand, jennifer\b|\bpriscilla hernandez\b|\bmuhammad zia ul haq\b|\brodriguez, miguel e\b|\bslattery, phillip t\b|\bmolly sanchez crowe\b|\bmuhammad zia ul-haq\b|\bousetrill al juwaii\b|\bjean-louis warnholz\b|\bchristine dal bello\b|\bmcauliffe, marisa s\b|\bdibble, elizabeth l\b|\belizabeth thornhill\b|\bfeltrnan, jeffrey d\b|\byousuf raza gillani\b|\baf-fo-principals-dl\b|\bmuaimnar al qaddafi\b|\belizabeth ontiveros\b|\bsucharita narayanan\b|\bfeltman, jeffrey d\b|\bjacqueline charles\b|\bmaier, christina a\b|\babdulbari al-arusi\b|\brobinson, brooks a\b|\bshapiro, andrew \.3\b|\bjames a\. baker iii\b|\bbenjamin netanyahu\b|\blakhdhir, kamala s\b|\bfielder, rebecca a\b|\babdurrahim el-keib\b|\bsullivan, jacob \.1\b|\bwilliam f\. buckley\b|\bmuhammad ayub khan\b|\bkennedy, patrick f\b|\bmohammed yussef el\b|\babu yahya al- libi\b|\broebuck, william v\b|\bsheldon whitehouse\b|\bchristopher harich\b|\bjean-claude bajeux\b|\babdurrahim el keib\b|\bgulbadin hikmatyar\b|\bverveer, melanne s\b|\bschwerin, daniel b\b|\bslobodan milosevic\b|\bmuhammad al-zahawi\b|\bslobodan milosevie\b|\banderson, brooke d\b|\bharris, jennifer m\b|\bamir mohammad agha\b|\bahmed abu khattala\b|\breines, philippe i\b|\bverveer, melanne 5\b|\babdelhalcim belhaj\b|\bdebasish chowdhury\b|\bmohamed al-qadhafi\b|\bnelson rockefeller\b|\balexander zaitchik\b|\blebanese hizballah\b|\bmaxwell, raymond d\b|\bfinley peter dunne\b|\balexander hamilton\b|\bmacmanus, joseph e\b|\babdullah bin zayed\b|\bmuammar at qaddafi\b|\babdelfattah younes\b|\besther chavez cano\b|\babdel latif sharif\b|\bfranklin roosevelt\b|\bgilmore, kristin m\b|\brichardson, eric n\b|\bbrooks a\. robinson\b|\bmustafa abdel jail\b|\bstanley mcchrystal\b|\bmichael o'halloran\b|\btheodore roosevelt\b|\br\. donahue peebles\b|\babdulaziz al-sasud\b|\bmadeleine albright\b|\bnuland, victoria 3\b|\banthony limberakis\b|\babdelhakirn belhaj\b|\bsanderson, janet a\b|\bmuammar al qaddafi\b|\bmustafa abdul jail\b|\bhenry a\. kissinger\b|\bsimpson, mordica m\b|\bricardo seitenfus\b|\bobeidah al-jarrah\b|\bhoward metzenbaum\b|\bronald e\. neumann\b|\bcoleman, claire i\b|\bdwight eisenhower\b|\bjeannemarie smith\b|\bpatricio martinez\b|\bsidney blumenthal\b|\bdavid j\. rothkopf\b|\bjeremy greenstock\b|\bavigdor lieberman\b|\bchristopher meyer\b|\bcaitlin klevorick\b|\bgarrard, steven d\b|\babdelhakim belhaj\b|\bfrancisco sanchez\b|\bcurtis, meghann a\b|\bgerald mcloughlin\b|\bposivak, stephen;\b|\bmartin mcguinness\b|\bdonilon, thomas e\b|\bdavid klinghoffer\b|\bstephanie browner\b|\btimothy j\. roemer\b|\bshannon, thomas a\b|\bbenjamin franklin\b|\brichard johannsen\b|\bmorton abramowitz\b|\blvlills, cheryl d\b|\bbrigitte pressler\b|\bsullivan, jacob 3\b|\barturo valenzuela\b|\bpolaschlk, joan a\b|\bmark anthony neal\b|\bfrank shakespeare\b|\bjamjoom, kareem n\b|\bshapiro, daniel b\b|\bterrence a\. duffy\b|\bohtagaki, johna 0\b|\bmuammar al qaddaf\b|\bwilliam fulbright\b|\bbill strassberger\b|\bmichael pelletier\b|\bsullivan, jacob i\b|\bburns, william \.1\b|\brichard holbrooke\b|\bmustafa abushagur\b|\bmichael bloomberg\b|\bhormats, robert d\b|\braja bhattacharya\b|\bmargaret thatcher\b|\bmohammed al-sissi\b|\bdrucker, milton k\b|\bfeisal abdul rauf\b|\bcampbell, piper a\b|\bkoutsis, steven c\b|\bcoleman, claire l\b|\blaszczych, joanne\b|\bcatherine hallock\b|\bgeorge h\. w\. bush\b|\brussell, daniel a\b|\bcaspar weinberger\b|\bcaitlin m\. hayden\b|\bsullivan, jacob j\b|\brandolph mcgrorty\b|\bmary beth leonard\b|\bjosefina gonzalez\b|\bmacris, gregory p\b|\bdebbie almontaser\b|\brichard l\. kugler\b|\bmustafa abdel mil\b|\bsullivan, jacob 1\b|\bpacheco, martha a\b|\bsidereas, evyenla\b|\bmustafa abdul jai\b|\bcrowley, philip 1\b|\beizenstat, stuart\b|\bjeffrey donaldson\b|\badolph a\. weinman\b|\bfriedrich, mary k\b|\bousama al jouwali\b|\bhanley, monica r\b|\bmohamed magariaf\b|\bnuiand, victoria\b|\brajdeep sardesai\b|\bjudith a\. mchale\b|\bchristine ashton\b|\bsullivan, jacobi\b|\bbulgrin, julie k\b|\bjacob j sullivan\b|\brobert g\. kaiser\b|\bdavid n\. merrill\b|\belizabeth bagley\b|\bharry mcpherson,\b|\bhaji abdul jabar\b|\bansar al-shariah\b|\blawrence summers\b|\bmitchell, george\b|\bmchale, judith a\b|\banil padmanabhan\b|\bcatlin m\. hayden\b|\bharvey sernovitz\b|\bharold w\. geisel\b|\bchollet, derek h\b|\belmira ibraimova\b|\bpatriarch mesrop\b|\bpeter eisenhauer\b|\bradovan karad2ie\b|\bjean-paul sartre\b|\bousama al-juwali\b|\b'ramsay, jaime t\b|\bandrea puchalsky\b|\bgeorge h\.w\. bush\b|\btiseke kasambala\b|\bezra taft benson\b|\bjonathan pollard\b|\bvartan gregorian\b|\bburns, william 3\b|\bbenito mussolini\b|\bmolly montgomery\b|\bburns, william j\b|\badam parkhomenko\b|\babdelhamid rifai\b|\bmatthew g\. olsen\b|\brichard viguerie\b|\brandy neugebauer\b|\bmeena shridharan\b|\bjiloty, lauren c\b|\barindam sengupta\b|\bsumilas, michele\b|\bkirby, michael d\b|\btimothy geithner\b|\bwilliam s\. white\b|\basif ali zardari\b|\bschrepel, dawn m\b|\balija izetbegovi\b|\bjohnson, brock a\b|\bfeltman, jeffrey\b|\brussel, daniel r\b|\bsukhwinder singh\b|\bgordon, philip h\b|\bjacobs, janice l\b|\bverma, richard r\b|\bnicholas sarkozy\b|\bmariela paniagua\b|\bjames earl jones\b|\bangela paiaveras\b|\bbader, jeffrey a\b|\bjacobs, janice 1\b|\bsamira lzaguirre\b|\bdianne feinstein\b|\babbaszadeh, nima\b|\bregan, michael b\b|\bdeborah mccarthy\b|\bpatricia ehrnman\b|\bclaire mccaskill\b|\bmike vanderboegh\b|\bjames f\. dobbins\b|\bthomas jefferson\b|\bcharles grassley\b|\babbaszadeh, myna\b|\bhamad bin jassim\b|\balford, edward m\b|\balexey druzhinin\b|\ba/lax blumenthal\b|\bduguid, gordon k\b|\bpierre esperance\b|\bsherman, wendy r\b|\bgeorge voinovich\b|\bjonathan m\. katz\b|\banne-marie brady\b|\baxelrod, david m\b|\bbarbara retzlaff\b|\bnick von mertens\b|\bsullivan, jacobj\b|\bchristopher dodd\b|\bmohammed rvlorsi\b|\bsimon, jessica l\b|\bmcdonald, kara c\b|\bwalsh, matthew p\b|\bjohnson, james r\b|\bousama at juwali\b|\bposivak, stephen\b|\bdorothy ngalombi\b|\bpervez musharraf\b|\bfrancois leotard\b|\bshailja kejriwal\b|\bsamira izaguirre\b|\bolson, richard g\b|\bsusan col i i ns\b|\bschlesinger, jr\.\b|\bdwayne l\. cline\b|\baustin-ferguson\b|\bharold w geissl\b|\bdimitris reppas\b|\bosama al-juwali\b|\bmark carruthers\b|\bvalmoro, lona 1\b|\bansar al sharia\b|\bomar al i3ashir\b|\byousef mangoush\b|\bj\. edgar hoover\b|\beliot shapleigh\b|\bdebbie stabenow\b|\bandrew sullivan\b|\bstevens, john c\b|\blouis b\. susman\b|\bmesrop mutafyan\b|\bdenis mcdonough\b|\babdullah shamia\b|\byigal schleifer\b|\baustan goolsbee\b|\bmaggie williams\b|\bdonald rumsfeld\b|\bjason straziuso\b|\bedwin a\. walker\b|\bsad\.dam hussein\b|\blynne gadkowski\b|\beustace mullins\b|\bmario lee lopez\b|\bemanuel cleaver\b|\bmitch mcconnell\b|\bblanche lincoln\b|\bmarshall petain\b|\babdulkadir aksu\b|\bchristina romer\b|\bgustafson_karen\b|\bprashanth rajan\b|\bmichael s\. lund\b|\btom pyszczynski\b|\bsufyan ben qumu\b|\bwalker, peggy j\b|\bhillarv clinton\b|\bshubhangi desai\b|\bcilia kerfuffie\b|\beugene mccarthy\b|\bsamuel freedman\b|\bornar al bashir\b|\bjames baker iii\b|\b°same al juwali\b|\bfred a\. shannon\b|\bhoney alexander\b|\bbecky bernhardt\b|\bbasher al assad\b|\bbond, michele t\b|\bmandelson watch\b|\byitzhak shapira\b|\brobert menendez\b|\bbondy, steven c\b|\bramsay, jaime t\b|\bmichael m ullen\b|\bkitty dimartino\b|\bjohn c\. calhoun\b|\bcline, dwayne l\b|\bstan mcchrystai\b|\bsmith, daniel b\b|\bmargaret scobey\b|\bmahmoud _fibril\b|\bhans binnendijk\b|\bfogarty, daniel\b|\bosama al juwali\b|\bfawzi abu kitef\b|\bchas w\. freeman\b|\bosama bin laden\b|\bpatricia lamego\b|\bnorman ornstein\b|\bprashant panday\b|\babraham lincoln\b|\banthony campolo\b|\bnides, thomas r\b|\bkarl eikenberry\b|\bjames s\. rogers\b|\bmills, cheryl d\b|\bcarson, johnnie\b|\bgeorge mcgovern\b|\bhubert humphrey\b|\bteddy roosevelt\b|\bdominic asquith\b|\bjoseph mccarthy\b|\bhanky, monica r\b|\bmuammar qaddafi\b|\bhoward phillips\b|\bdavid shambaugh\b|\bmichael janeway\b|\bbrooks robinson\b|\bstan mcchrystal\b|\baubrey chernick\b|\blauran lovelace\b|\bsusan povenmire\b|\bdaniel benjamin\b|\bsamuel brinkley\b|\broza otunbayeva\b|\brichard cordray\b|\bkatrina hourani\b|\bmishna gregoire\b|\bjohn f\. kennedy\b|\bbarry goldwater\b|\bmatthew hiltzik\b|\banushka asthana\b|\brhoda margesson\b|\bmuammar gaddafi\b|\bhenry kissinger\b|\bsutphin, paul r\b|\bsullivan, jacob\b|\bcoionia morelos\b|\bmo9rt zuckerman\b|\bcharles schumer\b|\bharry mcpherson\b|\bmohamed bujenah\b|\bdavid schaecter\b|\bnicolas sarkozy\b|\blamar alexander\b|\bvalmoro, lona j\b|\bwilliam zartman\b|\bsharon d\. james\b|\bjoseph stiglitz\b|\bnancy kachingwe\b|\bcharge robinson\b|\bbelqasim haftar\b|\brusso, robert v\b|\bmuammar qadhafi\b|\bhillary clinton\b|\bbashir al-kubty\b|\bhillary, cheryl\b|\bezekiel emanuel\b|\bpolt, michael c\b|\bwalid al-sakran\b|\bcoleman, claire\b|\blvette gonzalez\b|\bgeorge mitchell\b|\bevangeline arce\b|\bsufian bin qamu\b|\bkemal kerincsiz\b|\bandrea mitchell\b|\bmusharraf years\b|\bmiller, james n\b|\bmax blumenthal,\b|\bmills, cheryl 0\b|\bculver, chris d\b|\beverett dirksen\b|\bdamour, marie c\b|\bmontek aluwalia\b|\bdizzy gillespie\b|\bsoledad aguilar\b|\badam j\. grotsky\b|\bze'ev sternhell\b|\bsherlock holmes\b|\bpratap g\. pawar\b|\bsa-igha rat mi\b|\bmahmoud jibril\b|\bshyam asolekar\b|\bsanghar rahimi\b|\btorn perriello\b|\bphilip bobbitt\b|\bmort zuckerman\b|\blinda mcfadyen\b|\bjeff greenberg\b|\bmohnimed morsi\b|\bmichael deaver\b|\bs\. akbar zaidi\b|\bdaniel, joshua\b|\bnewt gin<trich\b|\bclaudia lvette\b|\bmichael bennet\b|\bkelvin kiyingi\b|\bamax al sharia\b|\brichard kugler\b|\bdick holbrooke\b|\bdeborah haynes\b|\bcarlos pascual\b|\bgregory macris\b|\bpark, pamela p\b|\bbarholomeos ii\b|\bgeorge w\. bush\b|\bdavies, glyn t\b|\bdennis gombert\b|\brobert maguire\b|\bmartha mendoza\b|\bellen tauscher\b|\bwalter mondale\b|\bwoodrow wilson\b|\bdavid domenici\b|\bryan christmas\b|\bcharles peters\b|\bjettison clegg\b|\bport-au-prince\b|\bpatricia lynch\b|\barvizu, alex a\b|\bbenaim, daniel\b|\bmary catherine\b|\bedward chaplin\b|\bosama biniadin\b|\bchuck grassley\b|\blyndon johnson\b|\bfavvzi abd all\b|\bgloria steinem\b|\bjoann lockhart\b|\bcardiel, daisy\b|\bnorman borlaug\b|\bbetsy whitaker\b|\bjohn m\. bryson\b|\balyson grunder\b|\bmax blumenthal\b|\bdavid petraeus\b|\bhenry mcdonald\b|\bloh, anthony x\b|\banthony weiner\b|\bwells, alice g\b|\bsusan domowitz\b|\bismail sallabi\b|\bsaddam hussein\b|\bkenneth merten\b|\bomar al bashir\b|\brichard condon\b|\bstuart smalley\b|\brobert spencer\b|\bdavid ignatius\b|\bsaud al-faisal\b|\bgeorge osborne\b|\bjanysh bakiyev\b|\bjames s rogers\b|\bshenoa simpson\b|\blord goldsmith\b|\bmichael steele\b|\bnicole peacock\b|\bmary 'landrieu\b|\bpeter robinson\b|\bpeter claussen\b|\bvladimir putin\b|\bdavid miliband\b|\bedwina sagitto\b|\bmohammed badie\b|\bmarianne scott\b|\bjohna ohtagaki\b|\bsadaam hussein\b|\bj\. bracken lee\b|\bandrew gravers\b|\bhickey, mary e\b|\bshaun woodward\b|\bpeter ricketts\b|\bdanielle brian\b|\barola, heidi r\b|\bsusilo bambang\b|\bbernie sanders\b|\bscarlis, basil\b|\bjames eastland\b|\bstrobe talbott\b|\borville schell\b|\brobert a\. caro\b|\bcharles mugabo\b|\bsanjoy narayan\b|\bsadiq al-mahdi\b|\bjohn e\. herbst\b|\bjack abriunoff\b|\bsanjay sachdev\b|\bosama al kwali\b|\bmission steven\b|\bwood, robert a\b|\bmohammed morsi\b|\brussell brooks\b|\bthais ruboneka\b|\bdavid horowitz\b|\bosama binladin\b|\bpreethi patkar\b|\bthomas shannon\b|\bmichael mullen\b|\bdonny -kuehner\b|\balbert r\. hunt\b|\bholtz, greta c\b|\bkelly, craig a\b|\bandrea santoro\b|\bdonald ritchie\b|\bbeth gili\.nsky\b|\bcharles rangel\b|\balan greenspan\b|\brobert gelbard\b|\bilario pantano\b|\bmahmoud fibril\b|\bmarisela ortiz\b|\botto preminger\b|\bahmad bukatela\b|\balcee hastings\b|\bbrooke shearer\b|\brebecca struwe\b|\bs cheryl mills\b|\bkarla rubinger\b|\bhassan ziglarn\b|\bmaura connelly\b|\bgaylord nelson\b|\bdavid rothkopf\b|\bgeorge schultz\b|\bsid blumenthal\b|\bcharlie palmer\b|\bharris, rian h\b|\bpraveen patkar\b|\bpiper campbell\b|\bwilliam ehrman\b|\bnina fedoroff,\b|\blindsey graham\b|\bdaniel webster\b|\bherbert hoover\b|\bgoodman, allan\b|\bross, dennis b\b|\bcharlie crist,\b|\brichard shelby\b|\bnuni berrusien\b|\banthony pigott\b|\bbenazir bhutto\b|\bchris mcshane\b|\blydia ellison\b|\ballan goodman\b|\bwilliam hague\b|\bgeorge romney\b|\bhassan ziglam\b|\bcharles moose\b|\bsalah bishari\b|\bdavid skorton\b|\bmevlut kurban\b|\bjoseph duffey\b|\bsolomon atayi\b|\bmartha johnso\b|\byasser arafat\b|\bclean skousen\b|\bjake sullivan\b|\brogers cidosa\b|\bkoch brothers\b|\babedin, hurna\b|\babd al-wahhab\b|\bbarks-ruggles\b|\bmike huckabee\b|\bjones, beth e\b|\bchuck schumer\b|\bjones, paul w\b|\brahi rn faiez\b|\bmohamed hosni\b|\banne seshadri\b|\bmohamad sowan\b|\bgeorge tiller\b|\bjon tollefson\b|\bthomas menino\b|\bbartholomew i\b|\bmarco aurelio\b|\bcharlie flynn\b|\btarun katiyal\b|\bmarc grossman\b|\bkhushali shah\b|\btoner, mark c\b|\bmargery eagan\b|\brush limbaugh\b|\bferuzan mehta\b|\blael brainard\b|\bedmund muskie\b|\barshiya sethi\b|\bnicholas gage\b|\bderek chollet\b|\bdeng xiaoping\b|\bgilmar mendes\b|\btilmann geske\b|\bmartin kramer\b|\balberto wilde\b|\bjames madison\b|\brooney, megan\b|\bgeorge shultz\b|\bfawzi abd all\b|\bmahmoud abbas\b|\bdonny kuehner\b|\bterri rookard\b|\bjudith mchale\b|\brice, susan e\b|\bmridual issar\b|\bali al-salabi\b|\bjake\.sulliyan\b|\bcleon skousen\b|\bwalid shoebat\b|\bpaul folmsbee\b|\btillman geske\b|\bwilliam cohen\b|\b'cheryl\.mills\b|\barlen specter\b|\boliver letwin\b|\bkarl semancik\b|\brobert hunter\b|\bmustafa abdel\b|\bolympia snowe\b|\bpamela geller\b|\bmills, cheryl\b|\blee bollinger\b|\bmalcolm smith\b|\bs akbar zaidi\b|\bgeorge kennan\b|\bdavid axelrod\b|\bcretz, gene a\b|\ball al-salabi\b|\bamir mohammad\b|\bsilvan shalom\b|\bmiriam sapiro\b|\bclifford levy\b|\bhenry jackson\b|\bjudy trabulsi\b|\botmar oehring\b|\bwolff, alex d\b|\bdavid cameron\b|\bwailes, jacob\b|\bburns strider\b|\bjustin cooper\b|\bsalim \.nabous\b|\bmohamad morsi\b|\bhale, david m\b|\bturk, david m\b|\bmatthew green\b|\bgeorge ketman\b|\bbill o'reilly\b|\bkendrick meek\b|\barnab goswami\b|\brichard lugar\b|\bmustafa abdul\b|\bbigalke 'karl\b|\bnewt gingrich\b|\btina flournoy\b|\bkristallnacht\b|\braj chengappa\b|\bstilin, jacob\b|\bwolfgang hade\b|\bdavid goldman\b|\brobyn remeika\b|\bdavid gregory\b|\bsimon johnson\b|\bsherrod brown\b|\bjames clapper\b|\bchris stevens\b|\bronald reagan\b|\bjames o'keefe\b|\bbecky fielder\b|\bmohammed swan\b|\bgeorge packer\b|\bpeter martino\b|\bbruce wharton\b|\bglen doherty,\b|\brobert wexler\b|\bshekhar gupta\b|\btaher sherkaz\b|\brachel maddow\b|\bsusan collins\b|\bdavid manning\b|\bterri schiavo\b|\blauren joloty\b|\bmohmmed morsi\b|\bjake\.sullivan\b|\brobb browning\b|\brichard haass\b|\bbraulio rosas\b|\blauren jiloty\b|\bsam brownback\b|\bsheikh hasina\b|\bcarlotta gall\b|\bmary spanger,\b|\bharry hopkins\b|\bmull, stephen\b|\bjoe lieberman\b|\bashley esarey\b|\brichard nixon\b|\bjavier solana\b|\btushar poddar\b|\bamy klobuchar\b|\brichard levin\b|\bshaw d\. janes\b|\bandrew mayock\b|\bsmita prakash\b|\bnina fedoroff\b|\bhissene habre\b|\bjohn b\. judis\b|\bjames dobbins\b|\bforman, james\b|\bkubiske, lisa\b|\bdenis mukwege\b|\bkarl semacik\b|\blona valmoro\b|\bjacob javits\b|\babedin, huma\b|\bneera tanden\b|\bcherie blair\b|\bsharon hardy\b|\bjohn boehner\b|\bahmadinej ad\b|\bkaren coates\b|\bmcleod, mary\b|\brudman, mara\b|\budith mchale\b|\bblair, oni k\b|\btong, kurt w\b|\bbetsy bassan\b|\bsharon lowen\b|\btrey grayson\b|\bpaul collier\b|\bdaniel pipes\b|\bjohn paul ii\b|\bmary spanger\b|\bsachar, alon\b|\bmohamoud (t)\b|\bheidi annabi\b|\bsami abraham\b|\babu khattala\b|\bbecker, john\b|\bdaniel akaka\b|\bjeff merkley\b|\bjimmy carter\b|\btoiv, nora f\b|\bpenn rhodeen\b|\babdullah bin\b|\bjames salley\b|\bkevin tebbit\b|\bugur ya%ksel\b|\bhakan tastan\b|\blisa bardack\b|\brahm emanuel\b|\bminint fawzi\b|\btony campolo\b|\bdan restrepo\b|\bcarsten holz\b|\bdavid wilson\b|\bhannah giles\b|\bfrida lambay\b|\bnachum segal\b|\bsmith bagley\b|\bjames pardew\b|\bcheryl mills\b|\bbarack obama\b|\bnecati aydin\b|\bblum, orna t\b|\blilia garcia\b|\bfeisai abdul\b|\bcorley kenna\b|\bjudas priest\b|\bfrank munger\b|\bed gillespie\b|\blouis susman\b|\btesone, mark\b|\bcooper udall\b|\bdaniel lynch\b|\brhonda shore\b|\bnitin vaidya\b|\bnancy pelosi\b|\brockefellers\b|\babedln, hume\b|\bgordon brown\b|\braila odinga\b|\blisa kubiske\b|\bdaniel bliss\b|\bjohn jenkins\b|\bjoe macmanus\b|\bhamid karzai\b|\bkevin melton\b|\babu harroura\b|\bjeff feltman\b|\blinda katehi\b|\bkatie glueck\b|\bglen doherty\b|\bpaul volcker\b|\bmark lippert\b|\bsean wilentz\b|\bjohn schmitz\b|\bpeggy walker\b|\bisaac alaton\b|\bdavid harris\b|\bscott roeder\b|\badam grotsky\b|\bsamuel adams\b|\buday shankar\b|\bgotoh, kay e\b|\bsarah binder\b|\brobert blake\b|\brobert crane\b|\btim geithner\b|\btalwar, pune\b|\bgracien jean\b|\bursula burns\b|\bs\.m\. krishna\b|\bdusty rhodes\b|\bbill clinton\b|\bsean haimity\b|\bjohn chilcot\b|\bsean hannity\b|\bsergio brito\b|\bbrandon webb\b|\bvijay chopra\b|\bcheryl\.mills\b|\bbashar assad\b|\bjames warren\b|\babd al jalil\b|\bsanjaya baru\b|\broger lyners\b|\bduffy, terry\b|\bmel martinez\b|\btommy franks\b|\bbarney frank\b|\bfarej darssi\b|\brobert gates\b|\brichard mack\b|\bbitter, rena\b|\bcheryl\.millf\b|\bali tarhouni\b|\bjim allister\b|\belizabeth ii\b|\btsou, leslie\b|\blesley clark\b|\bandrew cedar\b|\bchas freeman\b|\bleon panetta\b|\bperla, laura\b|\bminyon moore\b|\bpierre-louis\b|\bcolin powell\b|\brichard mays\b|\bdavid vitter\b|\bbekir ozturk\b|\brobert welch\b|\bhoward baker\b|\bdesk rebecca\b|\bzheng bijian\b|\bbenedict xvi\b|\bpeter orszag\b|\brupert smith\b|\ball tarhouni\b|\bdoug hoffman\b|\bp\.j\. crowley\b|\bsam brinkley\b|\bwestmoreland\b|\bdonna winton\b|\bjoseph biden\b|\bhaji jhapour\b|\bkelly, ian c\b|\bdonna bryson\b|\blebron james\b|\bpaul hinshaw\b|\bjim hoagiand\b|\babedin, hume\b|\bandrew frank\b|\bandrew cuomo\b|\bsean goldman\b|\bjim hoagland\b|\bpaul vallely\b|\bhickey, mary\b|\bmichael lund\b|\blynn allison\b|\bfrank church\b|\bmarie damour\b|\bsally osberg\b|\bbab al-aziza\b|\babd al-jalil\b|\bhuma abed in\b|\bjulien behal\b|\brajeev syal\b|\belena kagan\b|\bsteny hoyer\b|\bcraig kelly\b|\bgrey wolves\b|\brene preval\b|\btony newton\b|\bbartholomew\b|\bjohn haynes\b|\bdick cheney\b|\bdaniel gros\b|\btocqueville\b|\bsugash ghai\b|\bmike castle\b|\bjana winter\b|\bkim, sung y\b|\bhuma abedin\b|\bjoe mellott\b|\bmary pipher\b|\blaura lucas\b|\bsiria lopez\b|\btom donilon\b|\bjack rakove\b|\bpeter boone\b|\bgeorge bush\b|\bdaniel levy\b|\bregina addo\b|\balbert hunt\b|\bmitt romney\b|\braieev syai\b|\bkim, yuri j\b|\bross wilson\b|\bsyed, zia s\b|\bfouad ajami\b|\bban ki-moon\b|\bsarah palin\b|\bdrew westen\b|\bnorman dodd\b|\brich greene\b|\banil kapoor\b|\bmark takano\b|\bhma abedine\b|\bjeff gannon\b|\bsam pitroda\b|\bwahliabis-m\b|\bjames jones\b|\bmary scholl\b|\bmark zimmer\b|\bmason, whit\b|\baryeh eldad\b|\bira shapiro\b|\bnawaz shard\b|\bturgut ozal\b|\bdebra bowen\b|\brobert byrd\b|\bcheryl\.mill\b|\bamb stevens\b|\bunni mennon\b|\byan xuetong\b|\bwiley drake\b|\bshubada rao\b|\babdulrahman\b|\bdick durbin\b|\bkent conrad\b|\btorrey goad\b|\bfloyd flake\b|\bg\.p\. putnam\b|\bdeal hudson\b|\bwayne morse\b|\bdean debnam\b|\bel magariaf\b|\bhugo chavez\b|\bted kennedy\b|\bsam antonio\b|\bvicente fox\b|\bgerry adams\b|\bchris smith\b|\bmark warner\b|\bemma ezeazu\b|\bpat kennedy\b|\bahmadinejad\b|\brothschilds\b|\bjustin blum\b|\bjames baker\b|\bklinghoffer\b|\bturan topal\b|\bgerald ford\b|\bkapil sibal\b|\babu-shakour\b|\bbrian cowen\b|\bjohn breaux\b|\bban ki moon\b|\borhan kemal\b|\bed miliband\b|\blinda dewan\b|\bmike dewine\b|\bugur yuksel\b|\bruth marcus\b|\bamit tandon\b|\bjesse helms\b|\bchris huhne\b|\bjeff jacoby\b|\banne wexler\b|\bellen barry\b|\bvince cable\b|\btom daschle\b|\bg\. krishnan\b|\banwar iqbal\b|\bjohn mccain\b|\bsara devlin\b|\bvanderboegh\b|\bjim kennedy\b|\blohman, lee\b|\boman shahan\b|\bjohn sexton\b|\bkelli adams\b|\bal-mangoush\b|\bvalmoro, b6\b|\bim hoagland\b|\bjim bunning\b|\bsarah patin\b|\bernie banks\b|\btijen aybar\b|\blouis mazel\b|\bhoward stem\b|\banwar sadat\b|\bidriss deby\b|\bjuan carlos\b|\bjohn herbst\b|\brockefeller\b|\behud barak\b|\broy spence\b|\bglenn beck\b|\btim roemer\b|\bjan piercy\b|\balger hiss\b|\blord boyce\b|\bhaim saban\b|\bnahma kazi\b|\bravij shah\b|\beikenberry\b|\bharold koh\b|\bal franken\b|\bjohnsonian\b|\bcony blair\b|\bali zeidan\b|\bjacqueline\b|\banne marie\b|\bdavid frum\b|\bsteve wynn\b|\bfrank rich\b|\bben cardin\b|\bbob inglis\b|\bben nelson\b|\bousama al-\b|\borly taitz\b|\banne-marie\b|\bdavid laws\b|\btoni getze\b|\bbeknazarov\b|\bsean smith\b|\bmehna ghai\b|\bkevin rudd\b|\bbeth jones\b|\bkarimullah\b|\bvandeboegh\b|\bcunningham\b|\balmontaser\b|\btony blair\b|\bamb steven\b|\beric siila\b|\bbill frist\b|\balok mehta\b|\bblumenthal\b|\bken merten\b|\bdick armey\b|\bbill burns\b|\bweb, ake g\b|\bmark hyman\b|\bravi gupta\b|\bjack _mite\b|\bmel gibson\b|\balok gupta\b|\bmatt kibbe\b|\blee ferran\b|\bnazarbayev\b|\botunbayeva\b|\btom jensen\b|\btrey gowdy\b|\bali bhutto\b|\baleitiwali\b|\byoussef al\b|\bsta i bott\b|\bann selzer\b|\bsarah palm\b|\bdick lugar\b|\bkay warren\b|\bmeg keeton\b|\bgreg craig\b|\bsuly ponce\b|\bbirch bayh\b|\bsam dubbin\b|\bgeeta pasi\b|\bcarol kahn\b|\bjohn major\b|\babdulkadir\b|\bmark laity\b|\bgreg bloom\b|\bemin sirin\b|\btom coburn\b|\brichardson\b|\bjohn thune\b|\bsusan rice\b|\bralph reed\b|\balan feuer\b|\brahul john\b|\b01-28-2010\b|\bjohn birch\b|\bkathleen t\b|\buri avnery\b|\bcarl levin\b|\bjim demint\b|\blimberakis\b|\bnita lowey\b|\brich verma\b|\btomlinsonc\b|\bryan sorba\b|\btarun basu\b|\bezra pound\b|\bjeff skoll\b|\bjon tester\b|\bscozzafava\b|\babdel aziz\b|\bneugebauer\b|\bmuammar al\b|\bglenn back\b|\bjohn kerry\b|\btom harkin\b|\bliz cheney\b|\bharry reid\b|\blynn roche\b|\bamit khare\b|\btviagariaf\b|\bjudd gregg\b|\bwed sep 09\b|\btrent lott\b|\bmcchrystal\b|\balex dupuy\b|\brothschild\b|\bjohn lewis\b|\bjohn dunne\b|\bchris dodd\b|\bpj crowley\b|\bhrant dink\b|\bnick clegg\b|\bchancellor\b|\bmax baucus\b|\bjohn simon\b|\bal senussi\b|\ballen drur\b|\bjohn birks\b|\blarry king\b|\byussef al-\b|\bben yezza\b|\bian kelly\b|\bpatricofs\b|\byudhoyono\b|\bdipu moni\b|\bkachingwe\b|\babushagar\b|\bnancy roc\b|\bglad bill\b|\bperriello\b|\bmohamoucl\b|\babu kitef\b|\bdayutogiu\b|\bayub khan\b|\bgabrielle\b|\babushagur\b|\bsteinberg\b|\bcarlton a\b|\bsteven j\.\b|\bnursultan\b|\bmandarins\b|\bmesadieux\b|\bmacmillan\b|\babu salim\b|\blou dobbs\b|\bmcpherson\b|\bdavutogiu\b|\bma gariaf\b|\bkerincsiz\b|\bchristine\b|\bevan bayh\b|\batembayev\b|\bdan smith\b|\bpickering\b|\bkarl rove\b|\bwhitehall\b|\bmandeison\b|\bpuchalsky\b|\bmcdonough\b|\bjim jones\b|\bhezbollah\b|\bbelizaire\b|\bpaulo e-s\b|\bgeorge w\.\b|\bfeinstein\b|\bcarl chan\b|\bmccrystal\b|\bjefferson\b|\bbin laden\b|\bslaughter\b|\bel — keib\b|\btekebayev\b|\beizenstat\b|\bmagariars\b|\bmandelson\b|\bdavutoglu\b|\balexander\b|\bjoe biden\b|\bbob gates\b|\bben yazza\b|\bdoug band\b|\bmccaskill\b|\bgoldwater\b|\bfawzi abd\b|\bnora toiv\b|\bgonzalez,\b|\bjohn mann\b|\bvan jones\b|\btoby helm\b|\bali zidan\b|\bkarl marx\b|\bron wyden\b|\bnetanyahu\b|\blzaguirre\b|\bkissinger\b|\bpelletier\b|\bbollinger\b|\bspeckhard\b|\bpreminger\b|\bo'donnell\b|\btom udall\b|\bsinn fein\b|\bpoplawski\b|\ball zidan\b|\bpolaschik\b|\brand paul\b|\brobertson\b|\bal-wahhab\b|\bat juwali\b|\bmalcolm x\b|\bedward m\.\b|\bal-juwali\b|\bben smith\b|\bizaguirre\b|\boren sega\b|\blieberman\b|\bnavin sun\b|\bjoe duffy\b|\bbob dylan\b|\bholbrooke\b|\bjim odato\b|\barthur m\.\b|\bgary hart\b|\bsue brown\b|\bjoe feuer\b|\bmccaughey\b|\bhooverite\b|\bgorbachev\b|\bmusharraf\b|\bal juwali\b|\b\.vlassa\.d\b|\bmcconnell\b|\bgoldsmith\b|\bj\. edgar\b|\bmonrovia\b|\bthearill\b|\balbright\b|\bcamerfin\b|\bjosefina\b|\bmichelle\b|\bkhamenei\b|\bthurmond\b|\btauscher\b|\bmcgovern\b|\bcladeafi\b|\bhuckabee\b|\blyn lusi\b|\bpuri das\b|\bcampbell\b|\bmedvedev\b|\bchernoff\b|\bmccarthy\b|\bjack lew\b|\bmargaret\b|\bchernick\b|\bsamantha\b|\bfloyd m\.\b|\bdetvlint\b|\bqacihafi\b|\bcheryl d\b|\bchi minh\b|\bann beck\b|\bsl green\b|\bo'reilly\b|\bgrijalva\b|\bhumphrey\b|\bval moro\b|\bal-acusi\b|\bpetraeus\b|\bchaitkin\b|\bdaniel b\b|\bmangoush\b|\blimbaugh\b|\babdullab\b|\bqacklafl\b|\bibn 'abd\b|\babdullah\b|\bsbwhoeof\b|\bpaterson\b|\bmagariaf\b|\bcronkite\b|\bzulfikar\b|\bchaudhry\b|\bfluornoy\b|\bbrinkley\b|\bbenyezza\b|\bgregoire\b|\bal-arusi\b|\bduvalier\b|\bornstein\b|\bjim crow\b|\bfeingold\b|\bai-arusi\b|\btarasios\b|\blarouche\b|\bricketts\b|\bmalunoud\b|\bholbrook\b|\bphilippe\b|\bhamelech\b|\bsidereas\b|\bmiliband\b|\buc davis\b|\bal-anisi\b|\bgiffbrds\b|\brobinson\b|\bjohn lee\b|\btritevon\b|\ballister\b|\bgregory:\b|\bhastings\b|\bphilip 1\b|\bmagariar\b|\bcherubin\b|\bles gelb\b|\btarhouni\b|\bsullivan\b|\ba\. knopf\b|\bthatcher\b|\bbelgasim\b|\bjoseph e\b|\bcapricia\b|\bbob dole\b|\bgrassley\b|\bstiglitz\b|\bgeithner\b|\bfosnight\b|\bbakiyevs\b|\bmoriarty\b|\bmohammed\b|\bgingrich\b|\bsbwhoeop\b|\bbstrider\b|\bs\. akbar\b|\bjonathan\b|\bholliday\b|\bmorrisoc\b|\bgonzalez\b|\bhillary\b|\bjackson\b|\bkessler\b|\bboehner\b|\babraham\b|\berica 3\b|\brichard\b|\bziglarn\b|\bzigiarn\b|\bpascual\b|\bsolomon\b|\bchilcot\b|\bjon kyl\b|\bha\.fter\b|\binsulza\b|\bsbwhoeo\b|\bmerkley\b|\bgadhafi\b|\bschumer\b|\byitzhak\b|\bgoldman\b|\bjhapour\b|\briddick\b|\be1-kieb\b|\bverveer\b|\brebecca\b|\bdobbins\b|\bqadhafi\b|\bshapiro\b|\bcameron\b|\bbastien\b|\bhassadi\b|\bvolcker\b|\bmorales\b|\bwilliam\b|\bhabedin\b|\bmurdoch\b|\berdogan\b|\barchons\b|\bchemick\b|\bjo lusi\b|\bgravers\b|\bhastert\b|\bcollins\b|\bfillary\b|\bal dhan\b|\bwilders\b|\bed kemp\b|\bdoherty\b|\bmanning\b|\bsharron\b|\bmohamed\b|\bsussman\b|\bbakiyev\b|\bpreines\b|\bmagaref\b|\bsariyev\b|\bben van\b|\bal-keeb\b|\bsanders\b|\bbhutto'\b|\bkrishna\b|\bel-kieb\b|\bdeschle\b|\bk\.ennan\b|\btunisia\b|\bjohnson\b|\boehring\b|\bpodesta\b|\bgardner\b|\bmoammar\b|\bevyenia\b|\blindsey\b|\bclinton\b|\bmustafa\b|\bel-kelb\b|\bpollard\b|\bbennett\b|\bgregory\b|\bzardari\b|\bmichael\b|\bkennedy\b|\bschmidt\b|\bprern g\b|\bsaddarn\b|\bbobbitt\b|\bkuehner\b|\bhussein\b|\bspencer\b|\bcollier\b|\bstewart\b|\bal-keib\b|\bo'keefe\b|\bweather\b|\bsantoro\b|\bcochran\b|\bvalerie\b|\bclyburn\b|\bel keib\b|\bemanuel\b|\bdonilon\b|\bclaudia\b|\bwoodrow\b|\bel-keib\b|\bcrowley\b|\bstevens\b|\banthony\b|\bkhalifa\b|\bmartino\b|\bshapira\b|\bjarrett\b|\bsummers\b|\bgeitner\b|\bqaddafi\b|\bpol pot\b|\bbuckley\b|\bcharlie\b|\broebuck\b|\bwallace\b|\bdaschle\b|\bosborne\b|\bsheldon\b|\bskousen\b|\bgillani\b|\bclapper\b|\baguilar\b|\bgaddafi\b|\bbunning\b|\bantonio\b|\bdaalder\b|\bfranken\b|\bshoebat\b|\bschultz\b|\bbelhars\b|\bchi!cot\b|\baxelrod\b|\bmelanne\b|\bmohamad\b|\bqataris\b|\bmichele\b|\blebaron\b|\bbarbara\b|\bsarkozy\b|\bhousing\b|\bmikhail\b|\bnanda 5\b|\bshannon\b|\bheather\b|\blalanne\b|\bntanden\b|\bjaneway\b|\bzelaya\b|\bmullen\b|\bbashir\b|\balfred\b|\bpeters\b|\bsaddam\b|\bcorker\b|\beugene\b|\bhitler\b|\bsharia\b|\bbaucus\b|\bobaxna\b|\bcengiz\b|\bmoreno\b|\breagan\b|\bal- ai\b|\bfabius\b|\bjoseph\b|\bshaban\b|\bhilary\b|\bbarack\b|\bjabril\b|\bstalin\b|\brupert\b|\bbrooke\b|\bsusman\b|\bcantor\b|\btebbit\b|\bidriss\b|\bmerkel\b|\blana j\b|\bgeorge\b|\broemer\b|\bshelby\b|\bharich\b|\barturo\b|\brobert\b|\blyndon\b|\brafter\b|\bsharif\b|\bgeller\b|\bkramer\b|\bfallon\b|\bwerner\b|\bursula\b|\btiller\b|\bfaisal\b|\bdurbin\b|\bmelton\b|\bweiner\b|\bfoxman\b|\bashton\b|\bstrobe\b|\bbelhaj\b|\bhashem\b|\bstupak\b|\bcherie\b|\bwalton\b|\boba ma\b|\bpelosi\b|\bmendes\b|\bhalter\b|\bsodini\b|\bmarvin\b|\bclaire\b|\bconrad\b|\bcheney\b|\bziglam\b|\bkhalid\b|\bnelson\b|\bdooley\b|\boxford\b|\bguerra\b|\bwisner\b|\brivkin\b|\bpowell\b|\bpreval\b|\binglis\b|\bobam\.a\b|\b°barna\b|\bl\.b\.j\.\b|\bkabila\b|\bcornyn\b|\bromney\b|\bandrew\b|\bmassad\b|\bodinga\b|\balbeit\b|\brascon\b|\bobarna\b|\bkerman\b|\bortega\b|\bkristy\b|\bhudson\b|\bharris\b|\bwilson\b|\bheintz\b|\bwarner\b|\bpastor\b|\bmccain\b|\bkapoor\b|\bkennan\b|\byounes\b|\btakano\b|\bdamour\b|\bcarson\b|\bjibril\b|\bannabi\b|\bhassan\b|\bkarzai\b|\blouise\b|\bdemint\b|\bshahan\b|\bcheryl\b|\bhector\b|\baubrey\b|\bheftar\b|\bnathan\b|\bjuan s\b|\bhefter\b|\bparvez\b|\bjuarez\b|\bharkin\b|\behrman\b|\bmerten\b|\bbennet\b|\bdobson\b|\bcoburn\b|\bsophie\b|\bstruwe\b|\bmaddow\b|\blittle\b|\bsantos\b|\bdayton\b|\bgordon\b|\bsalehi\b|\bgraver\b|\btapper\b|\bbenson\b|\bnachum\b|\bholder\b|\bhaftar\b|\bsolana\b|\bmormon\b|\bchitre\b|\bsilvia\b|\bgarcia\b|\bjavits\b|\bdubbin\b|\bphilip\b|\bjuwali\b|\bmchale\b|\btories\b|\bsun zi\b|\bhoover\b|\boba\.ma\b|\bthomas\b|\bsherif\b|\bkazan\b|\bjalil\b|\bputin\b|\bshura\b|\bpipes\b|\bkerry\b|\bsadie\b|\bchris\b|\bobama\b|\bpiper\b|\bpitts\b|\brandy\b|\bobeda\b|\bsauer\b|\bsowan\b|\bcretz\b|\btaitz\b|\blarry\b|\bblair\b|\bbarna\b|\bjones\b|\btorah\b|\bwelch\b|\bchuck\b|\budall\b|\bhenry\b|\b!aura\b|\bjames\b|\bshaun\b|\buribe\b|\bwhite\b|\bmeraj\b|\babbas\b|\barusi\b|\bfrank\b|\bzidan\b|\broger\b|\blevin\b|\bpeter\b|\brosie\b|\bsingh\b|\bhelms\b|\bocher\b|\bmorsi\b|\bmeese\b|\blibya\b|\bmeyer\b|\bpeggy\b|\bbaker\b|\botmar\b|\bpaige\b|\bcowen\b|\banton\b|\bsorba\b|\bgheit\b|\bgrist\b|\bmarie\b|\bphiii\b|\bgregg\b|\bmalin\b|\bbrady\b|\broses\b|\bhamid\b|\barmey\b|\bglenn\b|\barutz\b|\bbrown\b|\bjafil\b|\bzheng\b|\bmarat\b|\bsteve\b|\bhaass\b|\bsnowe\b|\bsegal\b|\bsally\b|\bgiles\b|\bluers\b|\bhabre\b|\bpatin\b|\bjabar\b|\bsheva\b|\bdavid\b|\bhague\b|\bhasan\b|\bialil\b|\bboyce\b|\bscott\b|\bburns\b|\brabin\b|\bponce\b|\bkumar\b|\brabbi\b|\bharry\b|\biqbal\b|\bborwn\b|\bclegg\b|\bsusan\b|\blopez\b|\bsalon\b|\bmills\b|\bortiz\b|\bjaill\b|\brobyn\b|\bangle\b|\bdelay\b|\bnge,b\b|\bnixon\b|\bdenis\b|\bbecky\b|\bassad\b|\bsmith\b|\bbadie\b|\blewis\b|\bterry\b|\bjalii\b|\bsirin\b|\bjoyce\b|\bosama\b|\bgates\b|\brandi\b|\bleahy\b|\brosas\b|\bcasey\b|\bhamas\b|\blugar\b|\bsousa\b|\bpalin\b|\bstrom\b|\bstraw\b|\btorat\b|\bzaidi\b|\bderek\b|\bcolin\b|\boscar\b|\bbiden\b|\bbetsy\b|\bsarah\b|\bpenn\b|\bshah\b|\bholz\b|\bphil\b|\bcoup\b|\bmack\b|\bmarc\b|\bnick\b|\breid\b|\bnero\b|\bkeib\b|\byang\b|\bjill\b|\blona\b|\bpaul\b|\bdick\b|\bh rn\b|\bmatt\b|\bruss\b|\bbayh\b|\bibid\b|\bbart\b|\bwebb\b|\bbush\b|\bjose\b|\bjeff\b|\bhill\b|\bhuma\b|\bbeck\b|\btory\b|\bhart\b|\bjuan\b|\baziz\b|\brush\b|\bdede\b|\btony\b|\bkeit\b|\bryan\b|\bhaim\b|\baiwa\b|\bmike\b|\brove\b|\bjack\b|\bjail\b|\brauf\b|\bpalm\b|\bgary\b|\bdodd\b|\bsade\b|\beric\b|\bagha\b|\bsean\b|\baksu\b|\bqamu\b|\balec\b|\bmani\b|\bmeek\b|\brahm\b|\brice\b|\bayub\b|\blevy\b|\bmark\b|\b9/11\b|\belia\b|\bbill\b|\bclay\b|\bgeed\b|\btrig\b|\brand\b|\bjohn\b|\bjahr\b|\bcaro\b|\bburr\b|\bjake\b|\bnewt\b|\bdink\b|\blund\b|\bglen\b|\bford\b|\bdeby\b|\bkarl\b|\bsami\b|\bann\b|\bhbj\b|\bhb3\b|\bjoe\b|\bal-\b|\bban\b|\bamr\b|\bjim\b|\bski\b|\bjen\b|\bali\b|\bsid\b|\bdan\b|\bmax\b|\bcdm\b|\byan\b|\bjon\b|\bron\b|\bmcc\b|\bsby\b|\bemb\b|\bpam\b|\bmcd\b|\bjfk\b|\bsam\b|\bzia\b|\btom\b|\bkyl\b|\bhsf\b|\blyn\b|\bbob\b|\bel-\b|\bliz\b|\bwjc\b|\bsbu\b|\baui\b|\brob\b|\bmao\b|\babz\b|\bdfm\b|\bhrc\b|\bstu\b|\bkay\b|\btx\b|\bp3\b|\bcb\b|\bmo\b|\bch\b|\bw\.\b|\bed\b|\bal\b|\bdp\b|\bho\b|\bpj\b|\bnn\b|\bdd\b|\bel\b|\bh\b"
+    return runDetector(DETECTORS_BY_NAME["NAME"], raw_txt)
 
-    indexes = [
-        (i.start(), i.end()) for i in re.finditer(pattern, raw_txt,
-                                                  flags=re.IGNORECASE)
-    ]
-    for t in indexes:
-        entity = {}
-        entity["start"] = t[0]
-        entity["end"] = t[1]
-        entity["tag"] = "NAME"
-        entity["extent"] = raw_txt[t[0] : t[1]]
-        spans.append(entity)
-    return spans
 
+# An email is what r"\b[a-zA-Z0-9+_.-]+@[a-zA-Z]+\.[a-zA-Z]+\b" matches.
+# That regex rescans a long run of local part characters from every position
+# in it when no "@" follows, so EmailFinder matches from the "@" instead.
+EMAIL_DOMAIN = LazyPattern(r"@[a-zA-Z]++\.[a-zA-Z]++\b", flags=re.IGNORECASE)
+EMAIL_LOCAL_RUN = LazyPattern(r"[a-zA-Z0-9+_.-]*", flags=re.IGNORECASE)
+BOUNDARY = LazyPattern(r"\b")
 
-def getBasicAnnotations(raw_txt):
-    allAnnotations = []
-    allAnnotations.extend(getGenderAnnotations(raw_txt))
-    allAnnotations.extend(
-        getSpans(r"\b[a-zA-Z0-9+_.-]+@[a-zA-Z]+\.[a-zA-Z]+\b", raw_txt, "EMAIL")
+
+Detector = namedtuple("Detector", ["name", "tag", "properties", "find"])
+
+
+def checkDeadline(deadline):
+    if deadline is not None and time.perf_counter() > deadline:
+        raise TimeoutError("detector exceeded its time budget")
+
+
+# Whether findSpans also stops detectors by a timer signal. The signal and
+# the interval timer belong to the process, so only the command line entry
+# points turn this on; library callers get the detectors' deadline checks.
+_detector_alarm = False
+
+
+def useDetectorAlarm(enabled=True):
+    global _detector_alarm
+    _detector_alarm = enabled
+
+
+class DetectorAlarm:
+    """Stops a detector at its deadline wherever it is, in the middle of a
+    regex too, by a SIGALRM raising TimeoutError.
+
+    The timer is armed once per document and detectors only move the
+    deadline; an alarm going off before the deadline is set again for the
+    rest. The caller's handler and timer are restored on exit. Only with
+    useDetectorAlarm, on the main thread and where there is setitimer.
+    """
+
+    def __init__(self, budget):
+        self.budget = budget
+        self.deadline = None
+        self.enabled = (
+            _detector_alarm and budget is not None
+            and hasattr(signal, "setitimer")
+        )
+        if self.enabled:
+            import threading
+            self.enabled = threading.current_thread() is threading.main_thread()
+
+    def __enter__(self):
+        if self.enabled:
+            self.entered = time.perf_counter()
+            self.previous = signal.signal(signal.SIGALRM, self._expired)
+            self.previous_timer = signal.setitimer(signal.ITIMER_REAL,
+                                                   self.budget)
+        return self
+
+    def __exit__(self, *exc):
+        if self.enabled:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, self.previous)
+            delay, interval = self.previous_timer
+            if delay:
+                # What was left of the caller's timer; one that ran out in
+                # the meantime goes off right away.
+                delay -= time.perf_counter() - self.entered
+                signal.setitimer(signal.ITIMER_REAL, max(delay, 1e-6),
+                                 interval)
+
+    def start(self, deadline):
+        self.deadline = deadline
+
+    def stop(self):
+        self.deadline = None
+
+    def _expired(self, signum, frame):
+        left = self.budget
+        if self.deadline is not None:
+            left = self.deadline - time.perf_counter()
+            if left <= 0:
+                # Armed again for the detectors after this one.
+                signal.setitimer(signal.ITIMER_REAL, self.budget)
+                raise TimeoutError("detector exceeded its time budget")
+        signal.setitimer(signal.ITIMER_REAL, left)
+
+
+class PatternFinder:
+    def __init__(self, *patterns):
+        self.patterns = patterns
+
+    def __call__(self, raw_txt, deadline=None, windows=None):
+        patterns = [pattern.compile() for pattern in self.patterns]
+        if deadline is None:
+            return [
+                i.span() for pattern in patterns for i in pattern.finditer(raw_txt)
+            ]
+        spans = []
+        for pattern in patterns:
+            for i in pattern.finditer(raw_txt):
+                checkDeadline(deadline)
+                spans.append(i.span())
+        return spans
+
+    def fingerprint(self):
+        return "\n".join(f"{p.flags}:{p.pattern}" for p in self.patterns)
+
+
+# Every DATE and TIME match contains a digit, and every run of word characters
+# it touches lies wholly inside it. Runs without digits can only be a week day
+# and/or month, "to", "and" or part of an am/pm suffix, so any other such run
+# is a barrier no match crosses.
+DIGITS = LazyPattern(r"\d+")
+WORD_RUN = LazyPattern(r"\w+")
+WORD_CHARS = LazyPattern(r"\w*")
+INERT_RUN = LazyPattern(
+    rf"\b(?!(?:{WEEK_DAY}{MONTH}?|{MONTH}|to|and|[ap]\w?m\w?|[ap]|m\w?)\b)[^\W\d]+\b",
+    flags=re.IGNORECASE,
+)
+
+
+def digitWindows(raw_txt):
+    """Spans of raw_txt between barrier runs that contain a digit.
+
+    Every window starts and ends right after a barrier (or at the ends of the
+    text), so matching inside it gives the same matches as matching the whole
+    text.
+    """
+    digits_run, word_run, word_chars, inert_run = (
+        pattern.compile() for pattern in (DIGITS, WORD_RUN, WORD_CHARS, INERT_RUN)
     )
-    allAnnotations.extend(getTimeSpans(raw_txt))
-    allAnnotations.extend(getDateSpans(raw_txt))
-    allAnnotations.extend(getCountrySpans(raw_txt))
-    allAnnotations.extend(getURLSpans(raw_txt))
-    allAnnotations.extend(getStateSpans(raw_txt))
-    # allAnnotations.extend(getPhoneSpans(raw_txt))
-    allAnnotations.extend(getNameSpans(raw_txt))
-    allAnnotations.extend(getUnameAnnotations(raw_txt))
+    windows = []
+    size = len(raw_txt)
+    reverse = None
+    floor = 0
+    digits = digits_run.search(raw_txt)
+    while digits is not None:
+        if reverse is None:
+            reverse = raw_txt[::-1]
+        # Walk back over the words before the digits to the nearest barrier.
+        start = size - word_chars.match(reverse, size - digits.start()).end()
+        window_start = floor
+        while True:
+            word = word_run.search(reverse, size - start, size - floor)
+            if word is None:
+                break
+            word_start, word_end = size - word.end(), size - word.start()
+            if inert_run.match(raw_txt, word_start) is not None:
+                window_start = word_end
+                break
+            start = word_start
+        barrier = inert_run.search(raw_txt, digits.end())
+        window_end = barrier.end() if barrier is not None else size
+        windows.append((window_start, window_end))
+        floor = window_end
+        digits = digits_run.search(raw_txt, window_end)
+    return windows
+
+
+class WindowedPatternFinder(PatternFinder):
+    # Only runs the patterns inside digitWindows, which findSpans computes
+    # once per document; the matches are the same as PatternFinder's.
+    def __call__(self, raw_txt, deadline=None, windows=None):
+        if windows is None:
+            windows = digitWindows(raw_txt)
+        spans = []
+        for pattern in self.patterns:
+            pattern = pattern.compile()
+            for start, end in windows:
+                for i in pattern.finditer(raw_txt, start, end):
+                    checkDeadline(deadline)
+                    spans.append(i.span())
+        return spans
+
+
+class EmailFinder(PatternFinder):
+    """The matches of the email regex, found in time linear in the text.
+
+    Every "@" followed by a domain is walked back over its local part, and
+    the match starts at the first word boundary in it, where the regex would
+    have started it.
+    """
+
+    def __init__(self):
+        super().__init__(EMAIL_DOMAIN, EMAIL_LOCAL_RUN, BOUNDARY)
+
+    def __call__(self, raw_txt, deadline=None, windows=None):
+        domains, local_run, boundary = (p.compile() for p in self.patterns)
+        spans = []
+        floor = 0
+        for domain in domains.finditer(raw_txt):
+            checkDeadline(deadline)
+            at = domain.start()
+            # The local part ends at the "@" and starts no earlier than the
+            # last match ends. It is walked back in chunks, each twice as
+            # long as the one before.
+            start = at
+            size = 64
+            while start > floor:
+                chunk = raw_txt[max(floor, start - size):start][::-1]
+                run = local_run.match(chunk).end()
+                start -= run
+                if run < len(chunk):
+                    break
+                size *= 2
+            first = boundary.search(raw_txt, start, at)
+            if first is None or first.start() == at:
+                continue
+            spans.append((first.start(), domain.end()))
+            floor = domain.end()
+        return spans
+
+
+class DictionaryFinder:
+    def __init__(self, name, longest=False):
+        self.name = name
+        self.longest = longest
+
+    def __call__(self, raw_txt, deadline=None, windows=None):
+        matcher = _matcher(self.name)
+        if self.longest:
+            matches = matcher.findlongest(raw_txt, deadline)
+        else:
+            matches = matcher.findall(raw_txt, deadline)
+        return [(start, end) for start, end, _ in matches]
+
+    def fingerprint(self):
+        return f"{self.longest}:{_matcher(self.name).fingerprint}"
+
+
+class CombinedFinder:
+    def __init__(self, *finders):
+        self.finders = finders
+
+    def __call__(self, raw_txt, deadline=None, windows=None):
+        return [
+            span for finder in self.finders
+            for span in finder(raw_txt, deadline, windows)
+        ]
+
+    def fingerprint(self):
+        return "\n".join(finder.fingerprint() for finder in self.finders)
+
+
+# Detectors in the order their spans are emitted by getBasicAnnotations.
+DETECTORS = [
+    Detector("GENDER", "GENDER", None, DictionaryFinder("GENDER")),
+    Detector("EMAIL", "EMAIL", None, EmailFinder()),
+    Detector("TIME", "DATE-TIME", {"DATE-TIME-SUBTYPE": "TIME"},
+             WindowedPatternFinder(*TIME_PATTERNS)),
+    Detector("DATE", "DATE-TIME", {"DATE-TIME-SUBTYPE": "DATE"},
+             WindowedPatternFinder(DATE_PATTERN)),
+    Detector("COUNTRY", "ADDRESS", {"ADDRESS-SUBTYPE": ["COUNTRY"]},
+             CombinedFinder(DictionaryFinder("COUNTRY"),
+                            PatternFinder(*COUNTRY_PATTERNS))),
+    Detector("URL", "URL", None, PatternFinder(URL_PATTERN)),
+    Detector("STATE", "ADDRESS", {"ADDRESS-SUBTYPE": ["STATE"]},
+             DictionaryFinder("STATE")),
+    Detector("NAME", "NAME", None, DictionaryFinder("NAME", longest=True)),
+    Detector("USERNAME", "USERNAME", None, DictionaryFinder("USERNAME")),
+    Detector("PHONE", "PHONE", None, PatternFinder(PHONE_PATTERN)),
+]
+DETECTORS_BY_NAME = {detector.name: detector for detector in DETECTORS}
+
+
+# Bump to invalidate every cached match when detector code changes in a way
+# the fingerprints below cannot see.
+DETECTOR_VERSION = 1
+
+_fingerprints = {}
+
+
+def detectorFingerprint(detector):
+    if detector.name not in _fingerprints:
+        source = f"{DETECTOR_VERSION}\n{detector.find.fingerprint()}"
+        _fingerprints[detector.name] = hashlib.sha1(source.encode()).hexdigest()
+    return _fingerprints[detector.name]
+
+
+class Span:
+    """A detected span, kept compact until it is written out.
+
+    Tag and properties are shared through the detector and the extent is only
+    sliced from the text on output.
+    """
+
+    __slots__ = ("start", "end", "detector")
+
+    def __init__(self, start, end, detector):
+        self.start = start
+        self.end = end
+        self.detector = detector
+
+    def toDict(self, raw_txt):
+        ne = {}
+        if self.detector.properties:
+            ne["properties"] = {
+                key: list(value) if isinstance(value, list) else value
+                for key, value in self.detector.properties.items()
+            }
+        ne["start"] = self.start
+        ne["end"] = self.end
+        ne["tag"] = self.detector.tag
+        ne["extent"] = raw_txt[self.start:self.end]
+        return ne
 
-    return {"named_entity": sorted(allAnnotations, key=lambda x: x["start"])}
+
+def makeSpans(detector, matches, raw_txt):
+    return [Span(start, end, detector).toDict(raw_txt) for start, end in matches]
+
+
+def runDetector(detector, raw_txt):
+    return makeSpans(detector, detector.find(raw_txt), raw_txt)
+
+
+_detectors_warm = False
+
+
+def warmDetectors():
+    # Builds every lazily constructed automaton and pattern, e.g. before
+    # forking workers.
+    global _detectors_warm
+    for detector in DETECTORS:
+        detector.find("")
+    _detectors_warm = True
+
+
+# Earlier tags win overlaps under the "priority" rule and break ties under
+# "longest".
+TAG_PRIORITY = ["URL", "EMAIL", "DATE-TIME", "PHONE", "NAME", "USERNAME",
+                "ADDRESS", "GENDER"]
+
+Resolution = namedtuple("Resolution", ["rule", "tag_priority"])
+
+
+def resolveOverlaps(spans, resolution):
+    """Reduce start-sorted spans to a non-overlapping set in one sweep.
+
+    Each span is compared with the current winner of the overlapping run it
+    belongs to; under "longest" the longer span wins and tag priority breaks
+    ties, under "priority" it is the other way round. Tags missing from the
+    priority list rank last.
+    """
+    rank = {tag: i for i, tag in enumerate(resolution.tag_priority)}
+    last = len(rank)
+
+    if resolution.rule == "longest":
+        def key(span):
+            return (span.start - span.end, rank.get(span.detector.tag, last))
+    elif resolution.rule == "priority":
+        def key(span):
+            return (rank.get(span.detector.tag, last), span.start - span.end)
+    else:
+        raise ValueError(f"unknown resolution rule: {resolution.rule}")
+
+    resolved = []
+    current = None
+    for span in spans:
+        if current is not None and span.start < current.end:
+            if key(span) < key(current):
+                current = span
+            continue
+        if current is not None:
+            resolved.append(current)
+        current = span
+    if current is not None:
+        resolved.append(current)
+    return resolved
+
+
+# Seconds any one detector may spend on every BUDGET_CHARS characters of a
+# document, and on any shorter document, before it is skipped. The slowest
+# detectors scan well over 1 MB a second, so however large the document, it
+# only runs out where a detector is several times slower than usual.
+DETECTOR_TIME_BUDGET = 1.0
+BUDGET_CHARS = 1 << 18
+
+
+def detectorBudget(raw_txt, budget):
+    """Seconds each detector may spend on raw_txt, or None for no limit."""
+    if budget is None:
+        return None
+    return budget * max(1, len(raw_txt) / BUDGET_CHARS)
+
+
+def findSpans(raw_txt, cache=None, resolution=None, profile=None,
+              budget=DETECTOR_TIME_BUDGET):
+    """Run every detector over raw_txt.
+
+    Returns the start-sorted Spans and the names of the detectors that ran
+    out of time budget, which is budget seconds per BUDGET_CHARS characters.
+    """
+    budget = detectorBudget(raw_txt, budget)
+    if not _detectors_warm:
+        # Loading names.dict alone can take longer than a budget, so it is
+        # not charged to the first document's detectors.
+        warmDetectors()
+    if cache is not None:
+        text_hash = hashText(raw_txt)
+        cached = cache.lookup(text_hash)
+    if profile is not None:
+        profile.documents += 1
+        num_bytes = len(raw_txt.encode("utf-8", "surrogatepass"))
+
+    allAnnotations = []
+    timed_out = []
+    windows = None
+    with DetectorAlarm(budget) as alarm:
+        for detector in DETECTORS:
+            if cache is not None:
+                # Only detectors whose fingerprint changed since the text was
+                # cached are run again.
+                fingerprint = detectorFingerprint(detector)
+                entry = cached.get(detector.name)
+                if entry is not None and entry[0] == fingerprint:
+                    allAnnotations.extend(
+                        Span(start, end, detector) for start, end in entry[1]
+                    )
+                    continue
+            started = time.perf_counter()
+            deadline = started + budget if budget is not None else None
+            alarm.start(deadline)
+            try:
+                if windows is None and isinstance(detector.find,
+                                                  WindowedPatternFinder):
+                    windows = digitWindows(raw_txt)
+                matches = detector.find(raw_txt, deadline, windows)
+            except TimeoutError:
+                # The detector is skipped for this document, which is flagged
+                # and not cached so that a later run tries again.
+                matches = None
+                timed_out.append(detector.name)
+            finally:
+                alarm.stop()
+            if profile is not None:
+                profile.record(detector.name, time.perf_counter() - started,
+                               len(matches or ()), num_bytes)
+            if matches is None:
+                continue
+            if cache is not None:
+                cache.store(text_hash, detector.name, fingerprint, matches)
+            allAnnotations.extend(
+                Span(start, end, detector) for start, end in matches
+            )
+
+    allAnnotations.sort(key=attrgetter("start"))
+    if resolution is not None:
+        allAnnotations = resolveOverlaps(allAnnotations, resolution)
+    return allAnnotations, timed_out
+
+
+def getBasicAnnotations(raw_txt, cache=None, resolution=None, profile=None,
+                        budget=DETECTOR_TIME_BUDGET):
+    spans, timed_out = findSpans(raw_txt, cache, resolution, profile, budget)
+    annotations = {"named_entity": [span.toDict(raw_txt) for span in spans]}
+    if timed_out:
+        annotations["timed_out"] = timed_out
+    return annotations
+
+
+_span_encodings = {}
+
+
+def _spanEncoding(detector):
+    # The parts of a span's JSON that only depend on its detector.
+    if detector.name not in _span_encodings:
+        head = "{"
+        if detector.properties:
+            head += f'"properties": {json.dumps(detector.properties)}, '
+        _span_encodings[detector.name] = (
+            head + '"start": ',
+            f', "tag": {json.dumps(detector.tag)}, "extent": ',
+        )
+    return _span_encodings[detector.name]
+
+
+def encodeAnnotations(spans, timed_out, raw_txt):
+    """The JSON json.dumps would write for getBasicAnnotations' result."""
+    encoded = []
+    for span in spans:
+        head, tail = _spanEncoding(span.detector)
+        extent = encode_basestring_ascii(raw_txt[span.start:span.end])
+        encoded.append(f'{head}{span.start}, "end": {span.end}{tail}{extent}}}')
+    annotations = '{"named_entity": [' + ", ".join(encoded) + "]"
+    if timed_out:
+        annotations += ', "timed_out": ' + json.dumps(timed_out)
+    return annotations + "}"
+
+
+def encodeDocument(document, annotations):
+    """json.dumps(document), with the encoded annotations under "annotations"."""
+    document["annotations"] = None
+    return "{" + ", ".join(
+        encode_basestring_ascii(key) + ": "
+        + (annotations if key == "annotations" else json.dumps(value))
+        for key, value in document.items()
+    ) + "}"
 
 
 def simp_span(annot):
@@ -491,40 +1050,81 @@ def simp_tag(annot):
 
 INF = float('inf')
 
-def arbitrate(doc, context=50, width=50):
+class Alignment:
+    """Start-sorted annotation lists walked together, one row at a time.
+
+    A row holds the next span of every list that starts at the smallest
+    pending start, or None for lists without one.
+    """
+
+    def __init__(self, *annots):
+        self.annots = annots
+        self.heads = [0] * len(annots)
+
+    def nextRow(self):
+        start = INF
+        for annot, head in zip(self.annots, self.heads):
+            if head < len(annot):
+                start = min(start, annot[head]['start'])
+        if start == INF:
+            return None
+        row = []
+        for i, annot in enumerate(self.annots):
+            head = self.heads[i]
+            if head < len(annot) and annot[head]['start'] == start:
+                row.append(annot[head])
+                self.heads[i] += 1
+            else:
+                row.append(None)
+        return row
+
+    def skipTo(self, end, lists=None):
+        # Drops the spans starting before `end` from every list, or from the
+        # lists at the given positions.
+        for i in range(len(self.annots)) if lists is None else lists:
+            annot = self.annots[i]
+            head = self.heads[i]
+            while head < len(annot) and annot[head]['start'] < end:
+                head += 1
+            self.heads[i] = head
+
+
+def prepareArbitration(doc):
+    # Everything arbitrate needs that does not depend on the reviewer.
+    return (
+        sorted(doc['annotations']['named_entity'], key=lambda x: x['start']),
+        getBasicAnnotations(doc.get('raw_text'))['named_entity'],
+        sorted(doc['annotations_v2']['named_entity'], key=lambda x: x['start']),
+    )
+
+
+def arbitrate(doc, context=50, width=50, prepared=None):
+    from readchar import readchar
     from rich import print
     count = 0
     canon = []
-    j_annot = sorted(doc['annotations']['named_entity'], key= lambda x: x['start'])
-    l_annot = sorted(doc['annotations_v2']['named_entity'], key= lambda x: x['start'])
-    k_annot = getBasicAnnotations(doc.get('raw_text'))['named_entity']
+    j_annot, k_annot, l_annot = prepared or prepareArbitration(doc)
     print(f"Get ready to cross check around {max(len(j_annot), len(k_annot), len(l_annot))} docs. IS_PII_POSSIBLE={doc.get('is_pii_possible', 'Unknown')}")
     readchar()
-    # import pdb; pdb.set_trace();
-    while j_annot or k_annot or l_annot:
-        cj, ck, cl = [None, None, None]
-        start = INF
-        for c in j_annot, k_annot, l_annot:
-            # print(c)
-            if c:
-                start = min(start, c[0]['start'])
-        text = doc['raw_text']
-        if j_annot and j_annot[0]['start'] == start:
-            cj = j_annot.pop(0)
-        if k_annot and k_annot[0]['start'] == start:
-            ck = k_annot.pop(0)
-        if l_annot and l_annot[0]['start'] == start:
-            cl = l_annot.pop(0)
-        # print(cj, ck, cl)
+    text = doc['raw_text']
+    alignment = Alignment(j_annot, k_annot, l_annot)
+    while True:
+        row = alignment.nextRow()
+        if row is None:
+            break
+        cj, ck, cl = row
+        if cj == cl and cj is not None:
+            # Both human annotations agree, nothing to ask.
+            canon.append(cj)
+            alignment.skipTo(cj['end'])
+            continue
+        start = (cj or ck or cl)['start']
         end = (cj or ck or cl)['end']
         print(f"[red]{text[start-context:start]}[/][yellow]{text[start:end]}[/][red]{text[end:end+context]}[/]")
         print('')
         print(f"{simp_tag(cj):<50} -- {simp_tag(ck):^50} -- {simp_tag(cl):>50}")
         print(f"{simp_span(cj):<50} -- {simp_span(ck):^50} -- {simp_span(cl):>50}")
-        if cj == cl and cj is not None:
-            c = 'j'  # any one of those
-        else:
-            c = readchar()
+        c = readchar()
         while c not in 'qjkls':
             c = readchar()
         if c == 'q':
@@ -542,18 +1142,524 @@ def arbitrate(doc, context=50, width=50):
             for c in cj, ck, cl:
                 if c:
                     end = min(end, c['end'])
-        while j_annot and j_annot[0]['start'] < end:
-            j_annot.pop(0)
-        while k_annot and k_annot[0]['start'] < end:
-            k_annot.pop(0)
-        while l_annot and l_annot[0]['start'] < end:
-            l_annot.pop(0)
+        alignment.skipTo(end)
         print('\n')
         count += 1
         print(count)
     return canon
 
 
+def reviewFile(index, log, numbers, depth):
+    def prepare(number):
+        doc = index.read(number)
+        return number, doc, prepareArbitration(doc)
+
+    # The next documents are read and auto-annotated in the background while
+    # the reviewer works on the current one.
+    documents = prefetch(numbers, prepare, depth)
+    try:
+        for number, doc, prepared in documents:
+            print(f"Doc {number} of {len(index)}")
+            try:
+                annots = arbitrate(doc, prepared=prepared)
+            except KeyboardInterrupt:
+                print(f"Stopped at doc {number}; run again to resume.")
+                break
+            log.record(number, sorted(annots, key=lambda x: x["start"]))
+    finally:
+        documents.close()
+
+
+AUTO_RULES = ["agree", "majority", "span", "absent"]
+ARBITRATION_SOURCES = ["annotations", "auto", "annotations_v2"]
+
+
+def sameSpan(a, b):
+    return (
+        a is not None and b is not None
+        and (a['start'], a['end'], a['tag']) == (b['start'], b['end'], b['tag'])
+    )
+
+
+def autoArbitrate(doc, rules, prepared=None):
+    """Settle what the rules can without a reviewer.
+
+    "agree" settles rows where annotations and annotations_v2 mark the same
+    span, "majority" accepts a human span the detectors found too and "span"
+    one both humans marked with the same offsets and tag. "absent" drops a
+    detector span neither human marked; without it such rows are conflicts.
+    Returns the accepted spans, the rows no rule settles and the number of
+    rows each rule settled.
+    """
+    canon = []
+    conflicts = []
+    settled = Counter()
+    alignment = Alignment(*(prepared or prepareArbitration(doc)))
+    while True:
+        row = alignment.nextRow()
+        if row is None:
+            break
+        cj, ck, cl = row
+        for rule in rules:
+            if rule == "agree" and cj == cl and cj is not None:
+                choice = cj
+            elif rule == "absent" and cj is None and cl is None:
+                choice = None
+            elif rule == "majority" and (sameSpan(ck, cj) or sameSpan(ck, cl)):
+                choice = cj if sameSpan(ck, cj) else cl
+            elif rule == "span" and sameSpan(cj, cl):
+                choice = cj
+            else:
+                continue
+            settled[rule] += 1
+            if choice is not None:
+                canon.append(choice)
+                alignment.skipTo(choice['end'])
+            else:
+                # Neither human marked a span here; only the detector's
+                # overlapping spans go, theirs starting inside it are kept.
+                alignment.skipTo(ck['end'], [ARBITRATION_SOURCES.index("auto")])
+            break
+        else:
+            # The whole row, and whatever overlaps it, is left to a reviewer.
+            conflicts.append(dict(zip(ARBITRATION_SOURCES, row)))
+            alignment.skipTo(max(c['end'] for c in row if c))
+    return canon, conflicts, settled
+
+
+def agreementCounts(prepared):
+    """Per tag, the spans of every source and the exact matches of each pair."""
+    counts = defaultdict(Counter)
+    spans = {}
+    for source, annot in zip(ARBITRATION_SOURCES, prepared):
+        spans[source] = Counter((s['tag'], s['start'], s['end']) for s in annot)
+        for s in annot:
+            counts[s['tag']][source] += 1
+    for a, b in combinations(ARBITRATION_SOURCES, 2):
+        for (tag, _, _), n in (spans[a] & spans[b]).items():
+            counts[tag][f"{a}/{b}"] += n
+    return counts
+
+
+def agreementReport(counts):
+    # Agreement of a pair is the F1 of one source's spans against the other's.
+    stats = {}
+    for tag in sorted(counts):
+        tag_counts = counts[tag]
+        stats[tag] = {source: tag_counts[source] for source in ARBITRATION_SOURCES}
+        for a, b in combinations(ARBITRATION_SOURCES, 2):
+            total = tag_counts[a] + tag_counts[b]
+            pair = f"{a}/{b}"
+            stats[tag][pair] = 2 * tag_counts[pair] / total if total else None
+    return stats
+
+
+_worker_index = None
+_worker_rules = None
+
+
+def _initAutoWorker(path, rules):
+    global _worker_index, _worker_rules
+    _worker_index = DocumentIndex(path)
+    _worker_rules = rules
+
+
+def autoArbitrateDocument(number):
+    doc = _worker_index.read(number)
+    prepared = prepareArbitration(doc)
+    canon, conflicts, settled = autoArbitrate(doc, _worker_rules, prepared)
+    return number, canon, conflicts, settled, agreementCounts(prepared)
+
+
+def autoArbitrateFile(path, log, numbers, rules, workers, chunksize):
+    """Auto-arbitrate documents, recording every fully settled one in the log.
+
+    Documents with rows left over go to <path>.conflicts for review, and
+    per-tag agreement between the sources to <path>.agreement.json.
+    """
+    counts = defaultdict(Counter)
+    settled = Counter()
+    resolved = unresolved = 0
+    if workers > 1:
+        import multiprocessing
+        pool = multiprocessing.Pool(workers, _initAutoWorker, (path, rules))
+        results = pool.imap(autoArbitrateDocument, numbers, chunksize)
+    else:
+        pool = None
+        _initAutoWorker(path, rules)
+        results = map(autoArbitrateDocument, numbers)
+    try:
+        with open(path + ".conflicts", "w") as conflicts_file:
+            for number, canon, conflicts, doc_settled, doc_counts in results:
+                settled.update(doc_settled)
+                for tag, tag_counts in doc_counts.items():
+                    counts[tag].update(tag_counts)
+                if conflicts:
+                    unresolved += 1
+                    conflicts_file.write(json.dumps(
+                        {"doc": number, "conflicts": conflicts}) + "\n")
+                else:
+                    resolved += 1
+                    log.record(number, sorted(canon, key=lambda x: x["start"]),
+                               sync=False)
+        log.sync()
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    stats = agreementReport(counts)
+    with open(path + ".agreement.json", "w") as f:
+        json.dump(stats, f, indent=2)
+    print(f"{resolved} documents settled, {unresolved} left for review")
+    print("rows settled by rule: " + ", ".join(
+        f"{rule} {settled[rule]}" for rule in rules))
+    pairs = [f"{a}/{b}" for a, b in combinations(ARBITRATION_SOURCES, 2)]
+    print(f"{'tag':<12}" + "".join(f"{source:>16}" for source in ARBITRATION_SOURCES)
+          + "".join(f"{pair:>28}" for pair in pairs))
+    for tag, tag_stats in stats.items():
+        print(f"{tag:<12}"
+              + "".join(f"{tag_stats[source]:>16}" for source in ARBITRATION_SOURCES)
+              + "".join(f"{tag_stats[pair] or 0:>28.3f}" for pair in pairs))
+
+
+def prefetch(items, prepare, depth):
+    """Yield prepare(item) for every item, computed ahead in a thread.
+
+    Up to `depth` results wait in a queue; closing the generator stops the
+    thread.
+    """
+    import queue
+    import threading
+
+    results = queue.Queue(depth)
+    stop = threading.Event()
+    done = object()
+
+    def put(value):
+        while not stop.is_set():
+            try:
+                results.put(value, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def work():
+        try:
+            for item in items:
+                if not put((prepare(item), None)):
+                    return
+        except Exception as e:
+            put((None, e))
+            return
+        put((done, None))
+
+    thread = threading.Thread(target=work, daemon=True)
+    thread.start()
+    try:
+        while True:
+            result, error = results.get()
+            if error is not None:
+                raise error
+            if result is done:
+                return
+            yield result
+    finally:
+        stop.set()
+        thread.join()
+
+
+def annotateLine(line, cache=None, resolution=None, profile=None,
+                 budget=DETECTOR_TIME_BUDGET):
+    document = json.loads(line)
+    raw_txt = document["raw_text"]
+    spans, timed_out = findSpans(raw_txt, cache, resolution, profile, budget)
+    annotations = encodeAnnotations(spans, timed_out, raw_txt)
+    return encodeDocument(document, annotations) + "\n"
+
+
+# Characters either side of an edit that are scanned again with it.
+MERGE_MARGIN = 64
+
+# How --merge runs: the path of the input's earlier version, if any, and the
+# margin scanned around edits.
+Merge = namedtuple("Merge", ["previous", "margin"])
+
+
+def _commonPrefix(a, b):
+    # Length of the common prefix, by bisection over slice comparisons.
+    lo, hi = 0, min(len(a), len(b))
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[lo:mid] == b[lo:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def editedRange(old, new):
+    """(start, old_end, new_end) such that old[start:old_end] was replaced
+    by new[start:new_end] and the rest is unchanged."""
+    start = _commonPrefix(old, new)
+    suffix = _commonPrefix(old[start:][::-1], new[start:][::-1])
+    return start, len(old) - suffix, len(new) - suffix
+
+
+def shiftSpans(spans, start, old_end, new_end, raw_txt):
+    """The span dicts of the old text, moved to their place in raw_txt.
+
+    Spans after the edit move with the text. Spans across it are kept only
+    where their extent still reads the same.
+    """
+    delta = new_end - old_end
+    shifted = []
+    for span in spans:
+        if span["end"] <= start:
+            shifted.append(span)
+        elif span["start"] >= old_end:
+            shifted.append(dict(span, start=span["start"] + delta,
+                                end=span["end"] + delta))
+        elif raw_txt[span["start"]:span["end"]] == span.get("extent"):
+            shifted.append(span)
+    return shifted
+
+
+def rescanSpans(raw_txt, start, end, margin, resolution=None, profile=None,
+                budget=DETECTOR_TIME_BUDGET):
+    """findSpans for the edited raw_txt[start:end] only.
+
+    The detectors run over the edit widened by margin, which doubles while a
+    span runs into the edge of the window and so might continue past it.
+    Returns the spans that overlap or touch the edit.
+    """
+    size = len(raw_txt)
+    while True:
+        low, high = max(0, start - margin), min(size, end + margin)
+        spans, timed_out = findSpans(raw_txt[low:high], None, resolution,
+                                     profile, budget)
+        if not any((span.start == 0 and low) or
+                   (span.end == high - low and high < size) for span in spans):
+            break
+        margin *= 2
+    return [
+        Span(span.start + low, span.end + low, span.detector) for span in spans
+        if span.start + low <= end and span.end + low >= start
+    ], timed_out
+
+
+def mergeSpans(kept, spans, raw_txt):
+    """kept plus the dicts of those spans overlapping none of them, in start
+    order."""
+    kept = sorted(kept, key=lambda span: span["start"])
+    starts = [span["start"] for span in kept]
+    # Furthest end of the kept spans up to each one, as they may overlap.
+    reach = []
+    for span in kept:
+        reach.append(max(span["end"], reach[-1] if reach else span["end"]))
+    merged = list(kept)
+    for span in spans:
+        i = bisect_left(starts, span.end)
+        if i and reach[i - 1] > span.start:
+            continue
+        merged.append(span.toDict(raw_txt))
+    merged.sort(key=lambda span: span["start"])
+    return merged
+
+
+_previous_indexes = {}
+
+
+def previousDocument(path, number, document):
+    """Document `number` of the earlier version of the input at path, or None
+    when there is none or its id differs from document's."""
+    if path not in _previous_indexes:
+        _previous_indexes[path] = DocumentIndex(path)
+    index = _previous_indexes[path]
+    if number > len(index):
+        return None
+    previous = index.read(number)
+    if previous.get("id") != document.get("id"):
+        return None
+    return previous
+
+
+def mergeLine(line, number, merge, cache=None, resolution=None, profile=None,
+              budget=DETECTOR_TIME_BUDGET):
+    """annotateLine that keeps the spans a document already has.
+
+    Detected spans are added only where they overlap none of them. When the
+    earlier version of the document is known, its spans are taken to be
+    made on its text, and only the part of raw_text edited since is scanned.
+    """
+    document = json.loads(line)
+    raw_txt = document["raw_text"]
+    annotations = dict(document.get("annotations") or {})
+    kept = annotations.get("named_entity") or []
+    previous = None
+    if merge.previous is not None:
+        previous = previousDocument(merge.previous, number, document)
+    if previous is None:
+        spans, timed_out = findSpans(raw_txt, cache, resolution, profile, budget)
+    elif previous.get("raw_text") == raw_txt:
+        spans, timed_out = [], []
+    else:
+        start, old_end, new_end = editedRange(previous.get("raw_text") or "",
+                                              raw_txt)
+        kept = shiftSpans(kept, start, old_end, new_end, raw_txt)
+        spans, timed_out = rescanSpans(raw_txt, start, new_end, merge.margin,
+                                       resolution, profile, budget)
+    annotations["named_entity"] = mergeSpans(kept, spans, raw_txt)
+    earlier = annotations.pop("timed_out", None) or []
+    if previous is not None:
+        # Only the edit was scanned, so a detector that ran out of time on
+        # the document before has still not covered the rest of it.
+        timed_out = earlier + [name for name in timed_out if name not in earlier]
+    if timed_out:
+        annotations["timed_out"] = timed_out
+    document["annotations"] = annotations
+    return json.dumps(document) + "\n"
+
+
+def annotateItem(line, cache=None, resolution=None, profile=None,
+                 budget=DETECTOR_TIME_BUDGET, number=None, merge=None):
+    if merge is not None:
+        return mergeLine(line, number, merge, cache, resolution, profile, budget)
+    return annotateLine(line, cache, resolution, profile, budget)
+
+
+def serialAnnotate(lines, cache=None, resolution=None, profile=None,
+                   budget=DETECTOR_TIME_BUDGET, merge=None):
+    for i, line in enumerate(lines):
+        if profile is not None:
+            profile.current_doc = i + 1
+        yield annotateItem(line, cache, resolution, profile, budget, i + 1,
+                           merge)
+        if cache is not None and len(cache.pending) >= 1000:
+            cache.commit()
+    if cache is not None:
+        cache.commit()
+
+
+_worker_cache = None
+_worker_resolution = None
+_worker_profile_slowest = None
+_worker_budget = None
+_worker_merge = None
+
+
+def _initWorker(cache_path, resolution, profile_slowest, budget, merge,
+                alarm):
+    global _worker_cache, _worker_resolution, _worker_profile_slowest
+    global _worker_budget, _worker_merge
+    useDetectorAlarm(alarm)
+    if cache_path is not None:
+        _worker_cache = AnnotationCache(cache_path)
+    _worker_resolution = resolution
+    _worker_profile_slowest = profile_slowest
+    _worker_budget = budget
+    _worker_merge = merge
+    # An index inherited from the parent shares its file offset with it.
+    _previous_indexes.clear()
+
+
+def annotateLines(lines, first_doc):
+    # New cache entries and profile data are handed back to the parent, which
+    # is the only process writing to the cache.
+    profile = None
+    if _worker_profile_slowest is not None:
+        profile = DetectorProfile(_worker_profile_slowest)
+    annotated = []
+    for i, line in enumerate(lines):
+        if profile is not None:
+            profile.current_doc = first_doc + i
+        annotated.append(annotateItem(
+            line, _worker_cache, _worker_resolution, profile, _worker_budget,
+            first_doc + i, _worker_merge
+        ))
+    rows = _worker_cache.takePending() if _worker_cache is not None else []
+    return annotated, rows, profile
+
+
+def parallelAnnotate(lines, workers, chunksize, cache=None, resolution=None,
+                     profile=None, budget=DETECTOR_TIME_BUDGET, merge=None):
+    # Chunks are submitted through a bounded window rather than Pool.imap,
+    # whose feeder thread would read the whole input ahead of the writer.
+    import multiprocessing
+    lines = iter(lines)
+    warmDetectors()
+    cache_path = cache.path if cache is not None else None
+    profile_slowest = profile.slowest if profile is not None else None
+    with multiprocessing.Pool(
+        workers, _initWorker,
+        (cache_path, resolution, profile_slowest, budget, merge,
+         _detector_alarm)
+    ) as pool:
+        pending = deque()
+        next_doc = 1
+        while True:
+            chunk = list(islice(lines, chunksize))
+            if chunk:
+                pending.append(
+                    pool.apply_async(annotateLines, (chunk, next_doc))
+                )
+                next_doc += len(chunk)
+            if pending and (not chunk or len(pending) >= 2 * workers):
+                annotated, rows, chunk_profile = pending.popleft().get()
+                if rows:
+                    cache.commit(rows)
+                if chunk_profile is not None:
+                    profile.merge(chunk_profile)
+                yield from annotated
+            elif not chunk:
+                break
+
+
+def writeBatched(out_file, lines, size=1 << 20):
+    # One write per `size` characters of documents rather than one per
+    # document. A document that large is written on its own, so no more
+    # than it is held back or copied.
+    batch = []
+    pending = 0
+    for line in lines:
+        if len(line) >= size:
+            if batch:
+                out_file.write("".join(batch))
+                batch = []
+                pending = 0
+            out_file.write(line)
+            continue
+        batch.append(line)
+        pending += len(line)
+        if pending >= size:
+            out_file.write("".join(batch))
+            batch = []
+            pending = 0
+    if batch:
+        out_file.write("".join(batch))
+
+
+@contextmanager
+def atomicReplace(path):
+    # Writes go to a temp file next to `path`, which is renamed over it only
+    # once the block finishes, so a crash never leaves a truncated file.
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(
+        dir=directory, prefix="." + os.path.basename(path) + ".", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "w") as tmp_file:
+            yield tmp_file
+            tmp_file.flush()
+            os.fsync(tmp_file.fileno())
+        if os.path.exists(path):
+            shutil.copymode(path, tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
 
 
 def main():
@@ -561,30 +1667,124 @@ def main():
     parser.add_argument("--input", required=True, help="Input file path")
     parser.add_argument("--arbitrate", action="store_true",
                         help="Flag if file needs to be arbitrated.")
+    parser.add_argument("--doc", type=int,
+                        help="Document number to start arbitrating at; by "
+                             "default the first one without a decision.")
+    parser.add_argument("--prefetch", type=int, default=8,
+                        help="Documents prepared ahead while arbitrating.")
+    parser.add_argument("--auto", action="store_true",
+                        help="With --arbitrate, settle what --auto-rules can "
+                             "without a reviewer and list the rest in "
+                             "<input>.conflicts.")
+    parser.add_argument("--auto-rules", default="agree,majority",
+                        help="Comma separated rules out of "
+                             + ", ".join(AUTO_RULES) + ", tried in order.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of processes used to annotate documents.")
+    parser.add_argument("--chunksize", type=int, default=64,
+                        help="Documents sent to a worker at a time.")
+    parser.add_argument("--cache",
+                        help="Path of an annotation cache reused across runs.")
+    parser.add_argument("--resolve", choices=["longest", "priority"],
+                        help="Drop overlapping spans, keeping the longest or "
+                             "the highest priority tag.")
+    parser.add_argument("--tag-priority", default=",".join(TAG_PRIORITY),
+                        help="Comma separated tags, highest priority first.")
+    parser.add_argument("--profile", action="store_true",
+                        help="Print time, matches and throughput per detector.")
+    parser.add_argument("--profile-out",
+                        help="Also write the detector profile as JSON here.")
+    parser.add_argument("--time-budget", type=float,
+                        default=DETECTOR_TIME_BUDGET,
+                        help="Seconds a detector may spend on a document, "
+                             "per 256K characters of a longer one, before it "
+                             "is skipped and the document flagged with "
+                             "annotations.timed_out; 0 disables it.")
+    parser.add_argument("--merge", action="store_true",
+                        help="Keep the spans documents already have and only "
+                             "add detected spans that overlap none of them.")
+    parser.add_argument("--previous",
+                        help="With --merge, the version of the input the "
+                             "spans were made on; only text edited since is "
+                             "scanned again.")
+    parser.add_argument("--merge-margin", type=int, default=MERGE_MARGIN,
+                        help="Characters either side of an edit scanned "
+                             "again with it.")
     args = parser.parse_args()
-
-    with open(args.input, "r") as json_file:
-        documents = [json.loads(i) for i in list(json_file)]
-        # for i, doc in enumerate(documents):
-            # print(i+1, doc['is_pii_possible'], doc['language'], doc['excecption_type'])
-        # import pdb; pdb.set_trace()
+    if args.previous and not args.merge:
+        parser.error("--previous needs --merge")
+    budget = args.time_budget or None
+    rules = args.auto_rules.split(",")
+    for rule in rules:
+        if rule not in AUTO_RULES:
+            parser.error(f"unknown --auto-rules entry: {rule}")
+    resolution = None
+    if args.resolve:
+        resolution = Resolution(args.resolve, args.tag_priority.upper().split(","))
 
     if args.arbitrate:
-        # TODO: Allow option of choosing doc
-        with open(args.input + '.new', "w") as json_file:
-            for i, doc in enumerate(documents):
-                print(f"Doc {i+1} of {len(documents)}")
-                # TODO: Allow option of choosing doc
-                annots = arbitrate(doc)
-                doc["annotations"] = {
-                    "named_entity": sorted(annots, key=lambda x: x["start"])
-                }
-                json_file.write(json.dumps(doc) + "\n")
+        # Documents are read on demand through an offset index and every
+        # decision is appended to a log, so a session can stop at any
+        # document and later resume, or start at any --doc.
+        index = DocumentIndex(args.input)
+        log = DecisionLog(args.input + ".decisions")
+
+        def pending():
+            for number in range(args.doc or 1, len(index) + 1):
+                if number not in log.decisions or number == args.doc:
+                    yield number
+
+        try:
+            if args.auto:
+                autoArbitrateFile(args.input, log, pending(), rules,
+                                  args.workers, args.chunksize)
+            else:
+                reviewFile(index, log, pending(), args.prefetch)
+            with open(args.input + '.new', "w") as json_file:
+                for number in sorted(log.decisions):
+                    doc = index.read(number)
+                    doc["annotations"] = {"named_entity": log.decisions[number]}
+                    json_file.write(json.dumps(doc) + "\n")
+        finally:
+            log.close()
+            index.close()
     else:
-        with open(args.input, "w") as json_file:
-            for document in documents:
-                document["annotations"] = getBasicAnnotations(document["raw_text"])
-                json_file.write(json.dumps(document) + "\n")
+        useDetectorAlarm()
+        # Documents are streamed one at a time, so memory use is bounded by
+        # the largest document rather than the file.
+        cache = AnnotationCache(args.cache) if args.cache else None
+        profile = None
+        if args.profile or args.profile_out:
+            profile = DetectorProfile()
+        merge = None
+        if args.merge:
+            merge = Merge(args.previous, args.merge_margin)
+            if args.previous:
+                # Indexed here once rather than by every worker.
+                previousDocument(args.previous, 1, {})
+        try:
+            with atomicReplace(args.input) as out_file:
+                with open(args.input, "r") as json_file:
+                    lines = (line for line in json_file if line.strip())
+                    if args.workers > 1:
+                        annotated = parallelAnnotate(
+                            lines, args.workers, args.chunksize, cache,
+                            resolution, profile, budget, merge
+                        )
+                    else:
+                        annotated = serialAnnotate(
+                            lines, cache, resolution, profile, budget, merge
+                        )
+                    writeBatched(out_file, annotated)
+        finally:
+            if cache is not None:
+                cache.close()
+
+        if profile is not None:
+            if args.profile:
+                print(profile.report())
+            if args.profile_out:
+                profile.dump(args.profile_out)
 
 
 if __name__ == "__main__":
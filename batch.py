@@ -0,0 +1,181 @@
+"""Annotates directories of JSONL files across processes, resumably.
+
+Every file is annotated into <file>.partial, which replaces the file once it
+is complete. A SQLite manifest records how far into each file the run got,
+so a killed job picks up at its last checkpoint instead of starting over.
+
+    python3 batch.py --input data/ 'more/*.jsonl' --workers 8
+"""
+import argparse
+import glob
+import os
+import sqlite3
+from multiprocessing import Pool
+
+from annotation_cache import AnnotationCache
+from autoannotate import (
+    DETECTOR_TIME_BUDGET, TAG_PRIORITY, Resolution, annotateLine,
+    useDetectorAlarm, warmDetectors,
+)
+
+
+class Manifest:
+    """Progress of every input file, persisted in SQLite.
+
+    A row stores the size and mtime of the file it describes; progress on a
+    file that has changed since is discarded.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = sqlite3.connect(path, timeout=60)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            " path TEXT PRIMARY KEY,"
+            " size INTEGER NOT NULL,"
+            " mtime_ns INTEGER NOT NULL,"
+            " input_offset INTEGER NOT NULL,"
+            " output_offset INTEGER NOT NULL,"
+            " documents INTEGER NOT NULL,"
+            " done INTEGER NOT NULL)"
+        )
+        self._conn.commit()
+
+    def progress(self, path):
+        """(input_offset, output_offset, documents, done) for the file as it
+        is now, or None when there is no usable progress."""
+        stat = os.stat(path)
+        row = self._conn.execute(
+            "SELECT size, mtime_ns, input_offset, output_offset, documents, done"
+            " FROM files WHERE path = ?", (path,)
+        ).fetchone()
+        if row is None or row[:2] != (stat.st_size, stat.st_mtime_ns):
+            return None
+        return row[2:]
+
+    def update(self, path, stat, input_offset, output_offset, documents,
+               done=False):
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (path, stat.st_size, stat.st_mtime_ns, input_offset,
+                 output_offset, documents, int(done)),
+            )
+
+    def close(self):
+        self._conn.close()
+
+
+def findFiles(patterns):
+    # Directories contribute their *.jsonl files, anything else is a glob.
+    files = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = glob.glob(os.path.join(pattern, "*.jsonl"))
+        else:
+            matches = glob.glob(pattern)
+        files.extend(sorted(os.path.abspath(m) for m in matches))
+    return list(dict.fromkeys(f for f in files if os.path.isfile(f)))
+
+
+_manifest = None
+_cache = None
+_options = None
+
+
+def _initWorker(manifest_path, cache_path, options):
+    global _manifest, _cache, _options
+    _manifest = Manifest(manifest_path)
+    _cache = AnnotationCache(cache_path) if cache_path else None
+    _options = options
+    useDetectorAlarm()
+
+
+def annotateFile(path):
+    """Annotate one file from its last checkpoint on; returns (path, docs, status)."""
+    resolution, budget, checkpoint = _options
+    progress = _manifest.progress(path)
+    if progress is not None and progress[3]:
+        return path, progress[2], "skipped"
+    input_offset, output_offset, documents = (progress or (0, 0, 0))[:3]
+    status = "resumed" if input_offset else "done"
+
+    stat = os.stat(path)
+    partial = path + ".partial"
+    with open(path, "rb") as in_file, open(partial, "ab") as out_file:
+        # Anything after the last checkpoint is redone.
+        out_file.truncate(output_offset)
+        in_file.seek(input_offset)
+        since_checkpoint = 0
+        for line in in_file:
+            input_offset += len(line)
+            if not line.strip():
+                continue
+            out_file.write(
+                annotateLine(line.decode("utf-8"), _cache, resolution, None,
+                             budget).encode("utf-8")
+            )
+            documents += 1
+            since_checkpoint += 1
+            if since_checkpoint >= checkpoint:
+                if _cache is not None:
+                    _cache.commit()
+                out_file.flush()
+                os.fsync(out_file.fileno())
+                _manifest.update(path, stat, input_offset, out_file.tell(),
+                                 documents)
+                since_checkpoint = 0
+        out_file.flush()
+        os.fsync(out_file.fileno())
+    if _cache is not None:
+        _cache.commit()
+    os.replace(partial, path)
+    _manifest.update(path, os.stat(path), 0, 0, documents, done=True)
+    return path, documents, status
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input", required=True, nargs="+",
+                        help="Directories of .jsonl files or globs")
+    parser.add_argument("--manifest", default="autoannotate-manifest.db",
+                        help="Progress of the run, reused to resume it")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Files annotated in parallel")
+    parser.add_argument("--checkpoint", type=int, default=1000,
+                        help="Documents between two saved checkpoints")
+    parser.add_argument("--cache",
+                        help="Path of an annotation cache reused across runs.")
+    parser.add_argument("--resolve", choices=["longest", "priority"],
+                        help="Drop overlapping spans, keeping the longest or "
+                             "the highest priority tag.")
+    parser.add_argument("--tag-priority", default=",".join(TAG_PRIORITY),
+                        help="Comma separated tags, highest priority first.")
+    parser.add_argument("--time-budget", type=float,
+                        default=DETECTOR_TIME_BUDGET,
+                        help="Seconds a detector may spend on a document, "
+                             "per 256K characters of a longer one; 0 disables "
+                             "it.")
+    args = parser.parse_args()
+
+    resolution = None
+    if args.resolve:
+        resolution = Resolution(args.resolve, args.tag_priority.upper().split(","))
+    options = (resolution, args.time_budget or None, args.checkpoint)
+
+    files = findFiles(args.input)
+    print(f"{len(files)} files")
+    init_args = (args.manifest, args.cache, options)
+    if args.workers > 1:
+        warmDetectors()
+        with Pool(args.workers, _initWorker, init_args) as pool:
+            for path, documents, status in pool.imap_unordered(annotateFile, files):
+                print(f"{status:<8} {path} ({documents} documents)")
+    else:
+        _initWorker(*init_args)
+        for path, documents, status in map(annotateFile, files):
+            print(f"{status:<8} {path} ({documents} documents)")
+
+
+if __name__ == "__main__":
+    main()
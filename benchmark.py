@@ -0,0 +1,334 @@
+"""Benchmarks the annotation pipeline on a synthetic, reproducible corpus.
+
+Times every detector and getBasicAnnotations in-process, then the annotate,
+extract and invoice scripts end-to-end in fresh interpreters. Reports
+docs/sec, MB/sec and peak RSS, the start-up cost of autoannotate (its import
+time per module, and a one document run), and can save the results as a
+JSON baseline and compare a later run against it.
+
+    python3 benchmark.py --output baseline.json
+    python3 benchmark.py --baseline baseline.json
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import string
+import subprocess
+import sys
+import tempfile
+import time
+
+import autoannotate
+from detector_profile import DetectorProfile
+from dictionary_matcher import DictionaryMatcher, hashWordList, loadWordList
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+FILLER_WORDS = (
+    "the a of and to in is was for on that with as by at from this be are "
+    "have it not or an which were has been their more will would about "
+    "report account order payment request please thanks regards team "
+    "meeting office project customer service details number update"
+).split()
+
+ENTITY_TEMPLATES = [
+    lambda r, names: r.choice(names),
+    lambda r, names: r.choice(names).title() + " " + r.choice(names).title(),
+    lambda r, names: f"{r.choice(names).replace(' ', '.')}@example.com",
+    lambda r, names: f"https://www.example.org/{r.randint(1, 999)}/page?id={r.randint(1, 99)}",
+    lambda r, names: f"{r.randint(1, 28)}/{r.randint(1, 12)}/{r.randint(1950, 2030)}",
+    lambda r, names: f"{r.choice(['jan', 'March', 'sept', 'Dec'])} {r.randint(1, 28)}, {r.randint(1950, 2030)}",
+    lambda r, names: f"{r.randint(0, 23)}:{r.randint(0, 59):02d}:{r.randint(0, 59):02d}",
+    lambda r, names: f"{r.randint(1, 12)}:{r.randint(0, 59):02d} {r.choice(['am', 'pm'])}",
+    lambda r, names: f"{r.randint(200, 999)}-{r.randint(100, 999)}-{r.randint(1000, 9999)}",
+    lambda r, names: r.choice(autoannotate.COUNTRY_NAMES),
+    lambda r, names: r.choice(autoannotate.STATE_NAMES).title(),
+    lambda r, names: r.choice(autoannotate.GENDER_WORDS),
+    lambda r, names: r.choice(autoannotate.USERNAME_WORDS),
+]
+
+
+def syntheticNames(count, seed):
+    # The real name list, padded with made up names when count exceeds it.
+    names = loadWordList(autoannotate.NAMES_FILE)[::-1]
+    rng = random.Random(seed)
+    while len(names) < count:
+        names.append("".join(rng.choice(string.ascii_lowercase)
+                             for _ in range(rng.randint(4, 10))))
+    rng.shuffle(names)
+    return names[:count]
+
+
+def generateCorpus(path, num_docs, doc_words, density, names, seed):
+    """Write num_docs JSONL documents of about doc_words words each.
+
+    A fraction `density` of the tokens are entities of some detected kind.
+    """
+    rng = random.Random(seed)
+    with open(path, "w") as f:
+        for i in range(num_docs):
+            tokens = []
+            for _ in range(rng.randint(doc_words // 2, doc_words * 3 // 2)):
+                if rng.random() < density:
+                    tokens.append(rng.choice(ENTITY_TEMPLATES)(rng, names))
+                else:
+                    tokens.append(rng.choice(FILLER_WORDS))
+            document = {"id": i, "raw_text": " ".join(tokens),
+                        "is_pii_possible": True}
+            f.write(json.dumps(document) + "\n")
+
+
+def rates(seconds, docs, num_bytes):
+    return {
+        "seconds": seconds,
+        "docs_per_second": docs / seconds if seconds else None,
+        "mb_per_second": num_bytes / seconds / 1e6 if seconds else None,
+    }
+
+
+def benchDetectors(texts, repeat):
+    # Best of `repeat` passes over the corpus, per detector. Without a time
+    # budget, so that every detector scans every document in full.
+    autoannotate.warmDetectors()
+    num_bytes = sum(len(t.encode("utf-8")) for t in texts)
+    best = {}
+    for _ in range(repeat):
+        profile = DetectorProfile(slowest=0)
+        for i, raw_txt in enumerate(texts):
+            profile.current_doc = i + 1
+            autoannotate.getBasicAnnotations(raw_txt, profile=profile,
+                                            budget=None)
+        for name, stats in profile.stats.items():
+            best[name] = min(best.get(name, stats["seconds"]), stats["seconds"])
+
+    results = {name: rates(seconds, len(texts), num_bytes)
+               for name, seconds in best.items()}
+
+    seconds = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for raw_txt in texts:
+            autoannotate.getBasicAnnotations(raw_txt, budget=None)
+        elapsed = time.perf_counter() - started
+        seconds = elapsed if seconds is None else min(seconds, elapsed)
+    results["getBasicAnnotations"] = rates(seconds, len(texts), num_bytes)
+    return results
+
+
+def runChild(code, cwd):
+    """Run `code` in a fresh interpreter; return wall seconds and peak RSS MB."""
+    started = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-c", code], cwd=cwd,
+                            stdout=subprocess.DEVNULL)
+    _, status, usage = os.wait4(proc.pid, 0)
+    seconds = time.perf_counter() - started
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    if proc.returncode:
+        raise RuntimeError(f"benchmark child failed: {code}")
+    # ru_maxrss is in kilobytes on Linux.
+    return seconds, usage.ru_maxrss / 1024
+
+
+def scriptCode(script, argv, names_artifact=None):
+    code = f"import sys; sys.path.insert(0, {HERE!r}); sys.argv = {argv!r}\n"
+    if script == "autoannotate":
+        # The artifact is written next to the word list it is built from.
+        names_file = os.path.join(os.path.dirname(names_artifact), "names_file")
+        code += ("import autoannotate\n"
+                 f"autoannotate.NAMES_FILE = {names_file!r}\n"
+                 f"autoannotate.NAMES_ARTIFACT = {names_artifact!r}\n"
+                 "autoannotate.main()\n")
+    else:
+        code += f"import runpy; runpy.run_path({os.path.join(HERE, script)!r}, run_name='__main__')\n"
+    return code
+
+
+def importTimes(module, cwd):
+    """(seconds, {imported module: seconds}) to import `module` in a fresh
+    interpreter, from its -X importtime report; the modules are the ones it
+    imports directly, with what they import in turn."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c",
+                           f"import {module}"],
+                          cwd=cwd, capture_output=True, text=True, check=True)
+    # Lines read "import time: self [us] | cumulative | <indent>name", a
+    # module being listed after everything it imports.
+    seconds, modules = None, {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 0 and name.strip() == module:
+            seconds = int(cumulative) / 1e6
+            break
+        if depth == 1:
+            modules[name.strip()] = int(cumulative) / 1e6
+    return seconds, modules
+
+
+def benchStartup(workdir, names_artifact, repeat, top=8):
+    seconds = modules = None
+    for _ in range(repeat):
+        elapsed, times = importTimes("autoannotate", HERE)
+        if seconds is None or elapsed < seconds:
+            seconds, modules = elapsed, times
+    slowest = sorted(modules.items(), key=lambda m: -m[1])[:top]
+    results = {"import": {"seconds": seconds, "modules": dict(slowest)}}
+
+    # A one document file, where the run is all start-up.
+    single = os.path.join(workdir, "single.jsonl")
+    document = json.dumps({"id": 0, "raw_text": "Call john at 555-123-4567 "
+                           "on March 3, 2020", "is_pii_possible": True}) + "\n"
+    seconds = peak_rss = None
+    for _ in range(repeat):
+        with open(single, "w") as f:
+            f.write(document)
+        elapsed, rss = runChild(
+            scriptCode("autoannotate", ["autoannotate.py", "--input", single],
+                       names_artifact),
+            workdir,
+        )
+        seconds = elapsed if seconds is None else min(seconds, elapsed)
+        peak_rss = rss if peak_rss is None else max(peak_rss, rss)
+    results["annotate_one"] = dict(rates(seconds, 1, len(document)),
+                                   peak_rss_mb=peak_rss)
+    return results
+
+
+def benchFlows(workdir, corpus, names_artifact, num_docs, repeat):
+    num_bytes = os.path.getsize(corpus)
+    annotated_dir = os.path.join(workdir, "annotated")
+    annotated = os.path.join(annotated_dir, "corpus.jsonl")
+    flows = {
+        "annotate": lambda: (
+            shutil.copyfile(corpus, annotated),
+            scriptCode("autoannotate", ["autoannotate.py", "--input", annotated],
+                       names_artifact),
+        )[1],
+        "extract": lambda: scriptCode(
+            "extract_tags_from_annotated.py",
+            ["extract_tags_from_annotated.py", "--input", annotated_dir,
+             "--tag", "name", "date-time", "address"],
+        ),
+        "invoice": lambda: scriptCode(
+            "invoicer.py", ["invoicer.py", annotated_dir]
+        ),
+    }
+    os.makedirs(annotated_dir)
+    results = {}
+    for name, prepare in flows.items():
+        seconds = peak_rss = None
+        for _ in range(repeat):
+            elapsed, rss = runChild(prepare(), workdir)
+            seconds = elapsed if seconds is None else min(seconds, elapsed)
+            peak_rss = rss if peak_rss is None else max(peak_rss, rss)
+        results[name] = dict(rates(seconds, num_docs, num_bytes),
+                             peak_rss_mb=peak_rss)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Print per-benchmark changes against baseline; return the regressions."""
+    regressions = []
+    for section in ("detectors", "flows", "startup"):
+        for name, new in results[section].items():
+            old = baseline.get(section, {}).get(name)
+            if not old or not old.get("seconds") or not new["seconds"]:
+                continue
+            change = new["seconds"] / old["seconds"] - 1
+            flag = ""
+            if change > tolerance:
+                flag = "  REGRESSION"
+                regressions.append(name)
+            print(f"{section:<10} {name:<20} {old['seconds']:>9.3f}s "
+                  f"{new['seconds']:>9.3f}s {change:>+8.1%}{flag}")
+    if results["config"] != baseline.get("config"):
+        print("warning: baseline was recorded with a different configuration")
+    return regressions
+
+
+def report(results):
+    print(f"{'benchmark':<20} {'seconds':>9} {'docs/s':>10} {'MB/s':>8} {'peak RSS':>9}")
+    for section in ("detectors", "flows", "startup"):
+        for name, stats in results[section].items():
+            rss = stats.get("peak_rss_mb")
+            print(f"{name:<20} {stats['seconds']:>9.3f} "
+                  f"{stats.get('docs_per_second') or 0:>10.1f} "
+                  f"{stats.get('mb_per_second') or 0:>8.2f} "
+                  f"{f'{rss:.1f}MB' if rss is not None else '':>9}")
+    print("import autoannotate, slowest imports:")
+    for module, seconds in results["startup"]["import"]["modules"].items():
+        print(f"  {module:<30} {seconds * 1000:>7.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=500,
+                        help="Number of synthetic documents")
+    parser.add_argument("--doc-words", type=int, default=200,
+                        help="Average words per document")
+    parser.add_argument("--density", type=float, default=0.1,
+                        help="Fraction of tokens that are entities")
+    parser.add_argument("--names", type=int, default=None,
+                        help="Name dictionary size (default: names_file)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Runs per benchmark, the fastest is kept")
+    parser.add_argument("--skip-flows", action="store_true",
+                        help="Only time the detectors in-process")
+    parser.add_argument("--output", help="Write the results as JSON here")
+    parser.add_argument("--baseline", help="Compare against this results JSON")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="Slowdown over the baseline reported as a regression")
+    args = parser.parse_args()
+
+    num_names = args.names or len(loadWordList(autoannotate.NAMES_FILE))
+    config = {"docs": args.docs, "doc_words": args.doc_words,
+              "density": args.density, "names": num_names, "seed": args.seed}
+
+    workdir = tempfile.mkdtemp(prefix="autoannotate-bench-")
+    try:
+        names = syntheticNames(num_names, args.seed)
+        names_file = os.path.join(workdir, "names_file")
+        with open(names_file, "w") as f:
+            f.write("\n".join(names))
+        names_artifact = os.path.join(workdir, "names.dict")
+        DictionaryMatcher(loadWordList(names_file)).save(
+            names_artifact, hashWordList(names_file)
+        )
+        autoannotate.NAMES_FILE = names_file
+        autoannotate.NAMES_ARTIFACT = names_artifact
+        autoannotate._matchers.pop("NAME", None)
+
+        corpus = os.path.join(workdir, "corpus.jsonl")
+        generateCorpus(corpus, args.docs, args.doc_words, args.density, names,
+                       args.seed)
+        with open(corpus) as f:
+            texts = [json.loads(line)["raw_text"] for line in f]
+
+        results = {"config": config,
+                   "detectors": benchDetectors(texts, args.repeat),
+                   "flows": {},
+                   "startup": benchStartup(workdir, names_artifact,
+                                           args.repeat)}
+        if not args.skip_flows:
+            results["flows"] = benchFlows(workdir, corpus, names_artifact,
+                                          args.docs, args.repeat)
+    finally:
+        shutil.rmtree(workdir)
+
+    report(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
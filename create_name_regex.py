@@ -1,25 +1,27 @@
-import json
 import os
-import re
 import argparse
 
+from dictionary_matcher import DictionaryMatcher, hashWordList, loadWordList
+
+NAMES_ARTIFACT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "names.dict")
+
+
+def writeArtifact(names, source, path=NAMES_ARTIFACT):
+    # Written under a temp name first so a running annotator never loads a
+    # half-written artifact. The hash of the source word list tells the
+    # annotator when it was edited since.
+    tmp_path = path + ".tmp"
+    DictionaryMatcher(names).save(tmp_path, hashWordList(source))
+    os.replace(tmp_path, path)
+
 
 if __name__ == '__main__':
     ap = argparse.ArgumentParser()
     ap.add_argument("--input", required=True, help="Input file path")
+    ap.add_argument("--output", default=NAMES_ARTIFACT,
+                    help="Compiled name dictionary path")
     av = ap.parse_args()
 
-    with open(av.input, 'r') as f:
-        content = f.read()
-
-    name_list = sorted(list(set(list(map(lambda x: x.lower(),content.split('\n'))))),key=len,reverse=True)
-
-    with open('name_regex','w') as f:
-        outstr = []
-        for word in name_list:
-            if len(word)==0:
-                continue
-            word = re.sub(r'\.', '\.', word)
-            # word = re.sub(r'\s', '\\s', word)
-            outstr.append('\\b'+word.strip()+'\\b')
-        f.write('|'.join(outstr))
\ No newline at end of file
+    name_list = loadWordList(av.input)
+    writeArtifact(name_list, av.input, av.output)
+    print(f"{len(name_list)} names written to {av.output}")
@@ -0,0 +1,85 @@
+import heapq
+import json
+
+
+class DetectorProfile:
+    """Per-detector wall time, matches and bytes scanned across a run.
+
+    Also keeps the `slowest` documents for every detector, identified by
+    their line number in the input.
+    """
+
+    def __init__(self, slowest=5):
+        self.slowest = slowest
+        self.current_doc = None
+        self.documents = 0
+        self.stats = {}
+        self.slow_docs = {}
+
+    def record(self, detector, seconds, matches, num_bytes):
+        stats = self.stats.setdefault(
+            detector, {"seconds": 0.0, "matches": 0, "bytes": 0, "documents": 0}
+        )
+        stats["seconds"] += seconds
+        stats["matches"] += matches
+        stats["bytes"] += num_bytes
+        stats["documents"] += 1
+
+        heap = self.slow_docs.setdefault(detector, [])
+        entry = (seconds, self.current_doc if self.current_doc is not None else -1)
+        if len(heap) < self.slowest:
+            heapq.heappush(heap, entry)
+        elif heap and entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+
+    def merge(self, other):
+        self.documents += other.documents
+        for detector, stats in other.stats.items():
+            mine = self.stats.setdefault(
+                detector, {"seconds": 0.0, "matches": 0, "bytes": 0, "documents": 0}
+            )
+            for key, value in stats.items():
+                mine[key] += value
+        for detector, heap in other.slow_docs.items():
+            merged = self.slow_docs.get(detector, []) + heap
+            self.slow_docs[detector] = heapq.nlargest(self.slowest, merged)
+            heapq.heapify(self.slow_docs[detector])
+
+    def summary(self):
+        detectors = {}
+        for detector, stats in self.stats.items():
+            seconds = stats["seconds"]
+            detectors[detector] = dict(
+                stats,
+                mb_per_second=stats["bytes"] / seconds / 1e6 if seconds else None,
+                slowest=[
+                    {"doc": doc, "seconds": secs}
+                    for secs, doc in sorted(self.slow_docs[detector], reverse=True)
+                ],
+            )
+        return {"documents": self.documents, "detectors": detectors}
+
+    def dump(self, path):
+        with open(path, "w") as f:
+            json.dump(self.summary(), f, indent=2)
+
+    def report(self):
+        summary = self.summary()
+        total = sum(s["seconds"] for s in summary["detectors"].values()) or 1.0
+        lines = [
+            f"{'detector':<10} {'seconds':>9} {'share':>6} {'matches':>9} "
+            f"{'MB/s':>8}  slowest docs",
+        ]
+        for detector, stats in sorted(summary["detectors"].items(),
+                                      key=lambda x: -x[1]["seconds"]):
+            rate = stats["mb_per_second"]
+            slowest = ", ".join(
+                f"{s['doc']} ({s['seconds'] * 1000:.1f}ms)" for s in stats["slowest"]
+            )
+            lines.append(
+                f"{detector:<10} {stats['seconds']:>9.3f} "
+                f"{stats['seconds'] / total:>6.1%} {stats['matches']:>9} "
+                f"{rate if rate is not None else 0:>8.2f}  {slowest}"
+            )
+        lines.append(f"{summary['documents']} documents")
+        return "\n".join(lines)
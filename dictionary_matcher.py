@@ -0,0 +1,232 @@
+import hashlib
+import marshal
+import struct
+import time
+import zlib
+from collections import deque
+
+# Header of a saved matcher: magic, format version, number of words, option
+# flags, the fingerprint and the hash of the word list file it was built from,
+# followed by the zlib-compressed automaton.
+ARTIFACT_MAGIC = b"AADICT"
+ARTIFACT_VERSION = 2
+_HEADER = struct.Struct("<6sHIB40s40s")
+_WORD_END = 1
+_WHITESPACE = 2
+# Characters scanned between checks of the deadline.
+_DEADLINE_STRIDE = 4096
+
+
+def isWordChar(c):
+    return c.isalnum() or c == "_"
+
+
+def hashWordList(path):
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+class _FoldTable(dict):
+    # Maps a code point to its simple case fold, mirroring what re.IGNORECASE
+    # treats as equal, while keeping the text the same length.
+    def __init__(self, whitespace):
+        super().__init__()
+        self.whitespace = whitespace
+
+    def __missing__(self, code):
+        c = chr(code)
+        if self.whitespace and c.isspace():
+            folded = " "
+        else:
+            upper = c.upper()
+            folded = (upper if len(upper) == 1 else c).lower()[:1] or c
+        self[code] = folded
+        return folded
+
+
+_CASE_FOLD = _FoldTable(whitespace=False)
+
+
+def normalizeWord(word):
+    """A word list entry stripped, with every run of whitespace made one
+    space, and case folded as DictionaryMatcher folds text, so names that
+    only differ in spacing or case are one entry."""
+    return " ".join(word.split()).translate(_CASE_FOLD)
+
+
+def loadWordList(path):
+    with open(path, "r") as f:
+        words = {normalizeWord(line) for line in f}
+    words.discard("")
+    return sorted(words, key=lambda word: (-len(word), word))
+
+
+class DictionaryMatcher:
+    """Aho-Corasick automaton over a word list.
+
+    Matches are case-insensitive and must start on a word boundary (and, with
+    word_end, also end on one), i.e. they behave like r"\\b" + word + r"\\b".
+    With whitespace, any whitespace character in the text matches a space in a
+    word, like r"\\s" would.
+    """
+
+    def __init__(self, words, word_end=True, whitespace=False):
+        self._setOptions(list(words), word_end, whitespace)
+
+        goto = [{}]
+        out = [[]]
+        for index, word in enumerate(self.words):
+            state = 0
+            for c in self.fold(word):
+                nxt = goto[state].get(c)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][c] = nxt
+                    goto.append({})
+                    out.append([])
+                state = nxt
+            out[state].append(index)
+
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for c, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and c not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(c, 0)
+                out[nxt].extend(out[fail[nxt]])
+
+        self._goto = goto
+        self._fail = fail
+        self._out = [tuple(o) for o in out]
+
+    def _setOptions(self, words, word_end, whitespace):
+        # hashWordList of the file the words were read from, when saved with
+        # it.
+        self.source_hash = None
+        self.word_end = word_end
+        self.whitespace = whitespace
+        self._fold_table = _FoldTable(whitespace)
+        self.words = words
+        self.lengths = [len(w) for w in self.words]
+        self.fingerprint = hashlib.sha1(
+            "\n".join([str(word_end), str(whitespace)] + self.words).encode()
+        ).hexdigest()
+
+    def save(self, path, source_hash=None):
+        flags = (_WORD_END if self.word_end else 0) | (
+            _WHITESPACE if self.whitespace else 0
+        )
+        payload = zlib.compress(
+            marshal.dumps((self.words, self._goto, self._fail, self._out)), 9
+        )
+        with open(path, "wb") as f:
+            f.write(_HEADER.pack(ARTIFACT_MAGIC, ARTIFACT_VERSION, len(self.words),
+                                 flags, self.fingerprint.encode(),
+                                 (source_hash or "").encode()))
+            f.write(payload)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            header = f.read(_HEADER.size)
+            payload = f.read()
+        if len(header) < _HEADER.size:
+            raise ValueError(f"{path}: truncated dictionary artifact")
+        magic, version, count, flags, fingerprint, source_hash = _HEADER.unpack(
+            header
+        )
+        if magic != ARTIFACT_MAGIC:
+            raise ValueError(f"{path}: not a dictionary artifact")
+        if version != ARTIFACT_VERSION:
+            raise ValueError(
+                f"{path}: artifact version {version}, expected {ARTIFACT_VERSION}"
+            )
+        try:
+            words, goto, fail, out = marshal.loads(zlib.decompress(payload))
+        except (zlib.error, EOFError, TypeError, ValueError) as e:
+            raise ValueError(f"{path}: corrupt dictionary artifact ({e})") from e
+        matcher = cls.__new__(cls)
+        matcher._setOptions(words, bool(flags & _WORD_END), bool(flags & _WHITESPACE))
+        if len(words) != count or matcher.fingerprint != fingerprint.decode():
+            raise ValueError(f"{path}: corrupt dictionary artifact")
+        matcher.source_hash = source_hash.rstrip(b"\0").decode() or None
+        matcher._goto = goto
+        matcher._fail = fail
+        matcher._out = out
+        return matcher
+
+    def fold(self, text):
+        if text.isascii() and not self.whitespace:
+            return text.lower()
+        return text.translate(self._fold_table)
+
+    def candidates(self, raw_txt, deadline=None):
+        """Yield (start, end, index) for every boundary-respecting match.
+
+        Raises TimeoutError once time.perf_counter() passes deadline.
+        """
+        goto, fail, out, lengths = self._goto, self._fail, self._out, self.lengths
+        word_end = self.word_end
+        size = len(raw_txt)
+        folded = self.fold(raw_txt)
+        state = 0
+        for block in range(0, size, _DEADLINE_STRIDE):
+            if deadline is not None and time.perf_counter() > deadline:
+                raise TimeoutError("dictionary match exceeded its deadline")
+            for pos, c in enumerate(folded[block:block + _DEADLINE_STRIDE], block):
+                while state and c not in goto[state]:
+                    state = fail[state]
+                state = goto[state].get(c, 0)
+                if not out[state]:
+                    continue
+                end = pos + 1
+                if word_end:
+                    last_is_word = isWordChar(raw_txt[pos])
+                    if end < size and isWordChar(raw_txt[end]) == last_is_word:
+                        continue
+                    if end == size and not last_is_word:
+                        continue
+                for index in out[state]:
+                    start = end - lengths[index]
+                    first_is_word = isWordChar(raw_txt[start])
+                    if start:
+                        if isWordChar(raw_txt[start - 1]) == first_is_word:
+                            continue
+                    elif not first_is_word:
+                        continue
+                    yield start, end, index
+
+    def findall(self, raw_txt, deadline=None):
+        """Matches of each word, as separate re.finditer calls would find them.
+
+        Returns (start, end, index) ordered by word index, then start.
+        """
+        matches = sorted(self.candidates(raw_txt, deadline),
+                         key=lambda m: (m[2], m[0]))
+        result = []
+        last_end = {}
+        for start, end, index in matches:
+            if start >= last_end.get(index, 0):
+                result.append((start, end, index))
+                last_end[index] = end
+        return result
+
+    def findlongest(self, raw_txt, deadline=None):
+        """Leftmost-longest, non-overlapping matches of the whole word list.
+
+        Equivalent to re.finditer over a "|"-joined alternation of the words
+        sorted by decreasing length.
+        """
+        matches = sorted(self.candidates(raw_txt, deadline),
+                         key=lambda m: (m[0], -m[1]))
+        result = []
+        last_end = 0
+        for start, end, index in matches:
+            if start >= last_end:
+                result.append((start, end, index))
+                last_end = end
+        return result
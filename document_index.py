@@ -0,0 +1,119 @@
+import json
+import os
+import struct
+from array import array
+
+# Header of an index sidecar: magic, format version, then the size and
+# modification time of the indexed file, so a stale index is rebuilt.
+INDEX_MAGIC = b"AAIDX"
+INDEX_VERSION = 1
+_HEADER = struct.Struct("<5sHQQ")
+
+
+def indexPath(path):
+    return path + ".idx"
+
+
+def buildOffsets(path):
+    """Byte offsets of the non-blank lines of a JSONL file, in one pass."""
+    offsets = array("Q")
+    offset = 0
+    with open(path, "rb") as f:
+        for line in f:
+            if line.strip():
+                offsets.append(offset)
+            offset += len(line)
+    return offsets
+
+
+class DocumentIndex:
+    """Random access to the documents of a JSONL file by number.
+
+    Documents are numbered from 1 and blank lines are skipped, as when the
+    file is read in order. The offsets are kept in a <path>.idx sidecar.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        stat = os.stat(path)
+        self.offsets = self._load(stat)
+        if self.offsets is None:
+            self.offsets = buildOffsets(path)
+            self._save(stat)
+        self._file = open(path, "rb")
+
+    def _load(self, stat):
+        try:
+            with open(indexPath(self.path), "rb") as f:
+                header = f.read(_HEADER.size)
+                payload = f.read()
+        except FileNotFoundError:
+            return None
+        if len(header) < _HEADER.size:
+            return None
+        magic, version, size, mtime_ns = _HEADER.unpack(header)
+        if (magic, version, size, mtime_ns) != (
+            INDEX_MAGIC, INDEX_VERSION, stat.st_size, stat.st_mtime_ns
+        ):
+            return None
+        offsets = array("Q")
+        offsets.frombytes(payload)
+        return offsets
+
+    def _save(self, stat):
+        tmp_path = indexPath(self.path) + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, stat.st_size,
+                                 stat.st_mtime_ns))
+            f.write(self.offsets.tobytes())
+        os.replace(tmp_path, indexPath(self.path))
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def read(self, number):
+        if not 1 <= number <= len(self.offsets):
+            raise IndexError(f"document {number} out of range 1-{len(self)}")
+        self._file.seek(self.offsets[number - 1])
+        return json.loads(self._file.readline())
+
+    def close(self):
+        self._file.close()
+
+
+class DecisionLog:
+    """Append-only log of arbitrated annotations, one document per line.
+
+    A later entry for the same document replaces an earlier one.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.decisions = {}
+        line = "\n"
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # A line cut short by a crash mid-write.
+                        continue
+                    self.decisions[entry["doc"]] = entry["named_entity"]
+        self._file = open(path, "a")
+        if not line.endswith("\n"):
+            self._file.write("\n")
+
+    def record(self, number, named_entity, sync=True):
+        self._file.write(json.dumps({"doc": number, "named_entity": named_entity})
+                         + "\n")
+        if sync:
+            self.sync()
+        self.decisions[number] = named_entity
+
+    def sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
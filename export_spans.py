@@ -0,0 +1,165 @@
+"""Exports annotated JSONL files to Parquet for corpus-scale analytics.
+
+Every input file becomes <output>/spans/<file>.parquet, one row per
+named_entity span, and <output>/documents/<file>.parquet, one row per
+document with its word count as invoicer.py counts it. File, tag and subtype
+are dictionary-encoded and rows are written a row group at a time, so memory
+stays bounded by --row-group rather than the file. query_spans.py answers
+questions from the export without reading the JSONL again.
+
+    python3 export_spans.py --input annotated/ --output export/ --workers 8
+"""
+import argparse
+import json
+import os
+from multiprocessing import Pool
+
+from invoicer import countWords
+
+
+def requirePyarrow():
+    # pyarrow is only needed by the export and query scripts.
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise SystemExit("exporting spans needs pyarrow: pip install pyarrow")
+    return pyarrow, pyarrow.parquet
+
+
+def schemas(pa):
+    category = pa.dictionary(pa.int32(), pa.string())
+    spans = pa.schema([
+        ("file", category),
+        ("doc", pa.int64()),
+        ("id", pa.string()),
+        ("start", pa.int64()),
+        ("end", pa.int64()),
+        ("tag", category),
+        ("subtype", category),
+        ("extent", pa.string()),
+    ])
+    documents = pa.schema([
+        ("file", category),
+        ("doc", pa.int64()),
+        ("id", pa.string()),
+        ("words", pa.int64()),
+        ("spans", pa.int64()),
+    ])
+    return spans, documents
+
+
+def subtype(entity):
+    properties = entity.get("properties") or {}
+    value = properties.get("ADDRESS-SUBTYPE") or properties.get("DATE-TIME-SUBTYPE")
+    if isinstance(value, list):
+        return ",".join(value)
+    return value
+
+
+class RowGroupWriter:
+    """Rows gathered in memory and written to Parquet a row group at a time."""
+
+    def __init__(self, path, schema, row_group, compression):
+        pa, pq = requirePyarrow()
+        self.pa = pa
+        self.schema = schema
+        self.row_group = row_group
+        self.rows = []
+        self.writer = pq.ParquetWriter(path, schema, compression=compression)
+
+    def append(self, row):
+        self.rows.append(row)
+        if len(self.rows) >= self.row_group:
+            self.flush()
+
+    def flush(self):
+        if not self.rows:
+            return
+        columns = []
+        for field, values in zip(self.schema, zip(*self.rows)):
+            if self.pa.types.is_dictionary(field.type):
+                columns.append(self.pa.array(values, self.pa.string())
+                               .dictionary_encode())
+            else:
+                columns.append(self.pa.array(values, field.type))
+        self.writer.write_table(self.pa.Table.from_arrays(columns, schema=self.schema))
+        self.rows = []
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+
+def exportFile(path, output, row_group, compression):
+    """Write the spans and documents of one file; returns (path, docs, spans)."""
+    pa, _ = requirePyarrow()
+    span_schema, document_schema = schemas(pa)
+    name = os.path.basename(path)
+    parts = [os.path.join(output, table, name + ".parquet")
+             for table in ("spans", "documents")]
+    # Written under temp names so an interrupted export leaves no parts that
+    # look complete.
+    spans = RowGroupWriter(parts[0] + ".tmp", span_schema, row_group, compression)
+    documents = RowGroupWriter(parts[1] + ".tmp", document_schema, row_group,
+                               compression)
+    number = num_spans = 0
+    with open(path, "r") as json_file:
+        for line in json_file:
+            if not line.strip():
+                continue
+            number += 1
+            document = json.loads(line)
+            doc_id = document.get("id")
+            doc_id = str(doc_id) if doc_id is not None else None
+            entities = (document.get("annotations") or {}).get("named_entity") or []
+            for entity in entities:
+                spans.append((name, number, doc_id, entity["start"],
+                              entity["end"], entity["tag"], subtype(entity),
+                              entity.get("extent")))
+            num_spans += len(entities)
+            documents.append((name, number, doc_id,
+                              countWords(document["raw_text"]), len(entities)))
+    spans.close()
+    documents.close()
+    for part in parts:
+        os.replace(part + ".tmp", part)
+    return path, number, num_spans
+
+
+def _exportFile(args):
+    return exportFile(*args)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input", required=True, help="Input dir path")
+    parser.add_argument("--output", required=True,
+                        help="Directory the spans/ and documents/ tables go in")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of files exported in parallel")
+    parser.add_argument("--row-group", type=int, default=100000,
+                        help="Rows written to Parquet at a time")
+    parser.add_argument("--compression", default="zstd",
+                        help="Parquet compression codec")
+    args = parser.parse_args()
+    requirePyarrow()
+
+    for table in ("spans", "documents"):
+        os.makedirs(os.path.join(args.output, table), exist_ok=True)
+    paths = sorted(
+        os.path.join(args.input, f) for f in os.listdir(args.input)
+        if f.endswith(".jsonl") and os.path.isfile(os.path.join(args.input, f))
+    )
+    jobs = [(path, args.output, args.row_group, args.compression) for path in paths]
+    if args.workers > 1:
+        with Pool(args.workers) as pool:
+            results = list(pool.imap_unordered(_exportFile, jobs))
+    else:
+        results = list(map(_exportFile, jobs))
+    for path, documents, spans in sorted(results):
+        print(f"{path}: {documents} documents, {spans} spans")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,191 @@
 import argparse
+import heapq
 import json
+import os
+import tempfile
+from collections import Counter
+from itertools import chain
+from multiprocessing import Pool
 from os import listdir
 from os.path import isfile, join
 
 
+def extractFile(pth, tags, parts_dir):
+    """Streams one file into a part file per tag in parts_dir, holding the
+    tag's extents as JSON lines in document order.
+
+    Returns the file, the part file and number of extents of each tag and
+    the number of documents that could not be read.
+    """
+    parts = {}
+    for tag in tags:
+        fd, parts[tag] = tempfile.mkstemp(dir=parts_dir, suffix=".part")
+        os.close(fd)
+    outputs = {tag: open(part, "w") for tag, part in parts.items()}
+    counts = Counter()
+    errors = 0
+    try:
+        with open(pth, "r") as json_file:
+            for line in json_file:
+                document = json.loads(line)
+                if document is None:
+                    errors += 1
+                    continue
+                for entity in document["annotations"]["named_entity"]:
+                    tag = entity["tag"].lower()
+                    output = outputs.get(tag)
+                    if output is not None:
+                        output.write(json.dumps(entity["extent"]) + "\n")
+                        counts[tag] += 1
+    finally:
+        for output in outputs.values():
+            output.close()
+    return pth, parts, counts, errors
+
+
+def _extractFile(args):
+    return extractFile(*args)
+
+
+def readPart(part):
+    # The JSON lines of a part file, which is removed once read.
+    try:
+        with open(part, "r") as f:
+            for line in f:
+                yield json.loads(line)
+    finally:
+        os.remove(part)
+
+
+def extractFiles(paths, tags, workers, parts_dir):
+    jobs = [(pth, tags, parts_dir) for pth in paths]
+    if workers > 1:
+        with Pool(workers) as pool:
+            yield from pool.imap(_extractFile, jobs)
+    else:
+        yield from map(_extractFile, jobs)
+
+
+def writeLines(extents, output):
+    # Passes the extents on, writing each to output on the way.
+    for extent in extents:
+        output.write(extent + "\n")
+        yield extent
+
+
+def partitionExtents(extents, partitions, work_dir):
+    """Spreads the extents, as [position, extent], over `partitions` spill
+    files by hash, so that all copies of an extent land in the same file."""
+    spills = []
+    for _ in range(partitions):
+        fd, path = tempfile.mkstemp(dir=work_dir, suffix=".spill")
+        spills.append((path, os.fdopen(fd, "w")))
+    try:
+        for position, extent in enumerate(extents):
+            spill = spills[hash(extent) % partitions][1]
+            spill.write(json.dumps([position, extent]) + "\n")
+    finally:
+        for _, spill in spills:
+            spill.close()
+    return [path for path, _ in spills]
+
+
+def summarizePartition(spill, work_dir):
+    """Writes every distinct extent of a spill file with the position it
+    first occurs at, in position order, and with its count, most common
+    first. Returns the paths of the two files."""
+    first = {}
+    counts = Counter()
+    for position, extent in readPart(spill):
+        first.setdefault(extent, position)
+        counts[extent] += 1
+    summaries = []
+    for rows in (sorted((position, extent) for extent, position in first.items()),
+                 sorted(((count, extent) for extent, count in counts.items()),
+                        key=lambda x: (-x[0], x[1]))):
+        fd, path = tempfile.mkstemp(dir=work_dir, suffix=".summary")
+        with os.fdopen(fd, "w") as f:
+            f.writelines(json.dumps(row) + "\n" for row in rows)
+        summaries.append(path)
+    return summaries
+
+
+def distinctExtents(extents, total, capacity, work_dir):
+    """The distinct extents in order of first occurrence, and (count, extent)
+    most common first, both exact.
+
+    The extents are hash-partitioned to disk into spill files of about
+    `capacity` extents, so only one partition is held in memory at a time.
+    """
+    partitions = max(1, -(-total // capacity))
+    firsts, counts = [], []
+    for spill in partitionExtents(extents, partitions, work_dir):
+        first, count = summarizePartition(spill, work_dir)
+        firsts.append(first)
+        counts.append(count)
+    return (
+        (extent for _, extent in heapq.merge(*map(readPart, firsts))),
+        heapq.merge(*map(readPart, counts), key=lambda x: (-x[0], x[1])),
+    )
+
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--input", required=True, help="Input dir path")
-    parser.add_argument("--tag", required=True, help="Tag to be extracted")
+    parser.add_argument("--tag", required=True, action="extend", nargs="+",
+                        help="Tag(s) to be extracted, each into <tag>s.new")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of files processed in parallel")
+    parser.add_argument("--dedup", action="store_true",
+                        help="Write each extent once per tag")
+    parser.add_argument("--counts", action="store_true",
+                        help="Also write extent frequencies to <tag>s.counts")
+    parser.add_argument("--max-unique", type=int, default=1000000,
+                        help="Extents per tag that --dedup/--counts hold in "
+                             "memory at a time; more are spilled to disk")
     args = parser.parse_args()
 
-    documents = []
-    for pth in filter(isfile,
-                      map(lambda f: join(args.input, f), listdir(args.input))):
+    tags = {tag.lower(): tag for tag in args.tag}
+    paths = list(filter(isfile,
+                        map(lambda f: join(args.input, f), listdir(args.input))))
 
-        with open(pth, "r") as json_file:
-            documents.extend([json.loads(i) for i in list(json_file)])
-
-    with open(args.tag + "s.new", "w") as json_file:
-        for document in documents:
-            if document is None:
-                print("Error in")
-                continue
-            for entity in document["annotations"]["named_entity"]:
-                if entity["tag"].lower() == args.tag.lower():
-                    json_file.write(entity["extent"] + "\n")
+    outputs = {tag: open(name + "s.new", "w") for tag, name in tags.items()}
+    # Workers write the extents of every file to part files, so neither
+    # they nor this process hold more than a line of them at a time. For
+    # --dedup and --counts the parts are kept until every file is done.
+    kept = {tag: [] for tag in tags}
+    totals = Counter()
+    try:
+        with tempfile.TemporaryDirectory(prefix="extract-tags-") as parts_dir:
+            for pth, parts, counts, errors in extractFiles(paths, list(tags),
+                                                           args.workers,
+                                                           parts_dir):
+                if errors:
+                    print("Error in", pth)
+                for tag, part in parts.items():
+                    if args.dedup or args.counts:
+                        kept[tag].append(part)
+                        totals[tag] += counts[tag]
+                    else:
+                        outputs[tag].writelines(
+                            extent + "\n" for extent in readPart(part)
+                        )
+            if args.dedup or args.counts:
+                for tag, name in tags.items():
+                    extents = chain.from_iterable(map(readPart, kept[tag]))
+                    if not args.dedup:
+                        extents = writeLines(extents, outputs[tag])
+                    first, counted = distinctExtents(extents, totals[tag],
+                                                     args.max_unique, parts_dir)
+                    if args.dedup:
+                        outputs[tag].writelines(extent + "\n" for extent in first)
+                    if args.counts:
+                        with open(name + "s.counts", "w") as counts_file:
+                            for count, extent in counted:
+                                counts_file.write(f"{count}\t{extent}\n")
+    finally:
+        for json_file in outputs.values():
+            json_file.close()
 
 
 if __name__ == "__main__":
@@ -1,60 +1,114 @@
 ##
 import json
 import os
-import subprocess
+import re
+import unicodedata
 from collections import defaultdict
-from math import ceil
 from sys import argv
 
+import numpy as np
 import pandas as pd
 
 ##
 
 
-DIRECTORY = argv[1] if 1 < len(argv) < 4 else "."
-RATE = int(argv[2]) if len(argv) == 3 else 7
-
-files = list(filter(lambda x: ".jsonl" in x, os.listdir(DIRECTORY)))
-
-documents = defaultdict(list)
-for file in files:
-    with open(os.path.join(DIRECTORY, file)) as f:
-        documents[file].extend(
-            map(lambda x: x["raw_text"], [json.loads(i) for i in list(f)])
-        )
-
-doc_lens = defaultdict(list)
-for file, doc_list in documents.items():
-    filename = f"/tmp/raw_doc.tmp"
-    for doc in doc_list:
-        with open(filename, "w") as f:
-            f.write(doc)
-        doc_lens[file].append(
-            int(subprocess.check_output(["wc", "-w", filename]).split()[0])
-        )
-
-del documents
-
-count, total = 0, 0
-print(f"doc lengths: {doc_lens}")
-print(f"#files: {len(files)}")
-with open("invoice.csv", "w") as f:
-    for file, lens in doc_lens.items():
-        f.writelines(file)
-        num_docs, num_words, file_total = 0, 0, 0
-
-        for doclen in lens:
-            doc_price = RATE * ceil(doclen / 150)
-            f.writelines(f"\n{doclen}, {doc_price}")
-            count += 1
-            total += doc_price
-            num_docs += 1
-            num_words += doclen
-            file_total += doc_price
-        f.writelines(f"\nDocuments: {num_docs}, Words: {num_words}, total: {file_total}\n\n")
-    f.writelines(f"\nGrand Total, {total}")
-
-    print("invoice.csv generated")
-    print(f"#Documents: {count}")
-    print(f"Total: {total}")
-##
+WORDS_PER_UNIT = 150
+
+
+# Word counts follow GNU `wc -w` under the UTF-8 locale Python gives child
+# processes: a word is a run of non-separator characters containing at least
+# one printable character. Like wc, no-break spaces also separate words.
+SEPARATORS = frozenset(
+    "\t\n\v\f\r \u1680\u2000\u2001\u2002\u2003\u2004\u2005\u2006\u2008"
+    "\u2009\u200a\u205f\u3000\xa0\u2007\u202f\u2060"
+)
+ASCII_CONTROL = re.compile(r"[\x00-\x08\x0e-\x1f\x7f]")
+
+
+class WordClasses(dict):
+    # Translation table mapping separators to " ", printable characters to
+    # "x" and dropping the rest, so words are the runs of "x" left behind.
+    def __missing__(self, code):
+        c = chr(code)
+        if c in SEPARATORS:
+            value = " "
+        elif c.isprintable() or unicodedata.category(c) in ("Co", "Cf", "Zs"):
+            value = "x"
+        else:
+            value = None
+        self[code] = value
+        return value
+
+
+WORD_CLASSES = WordClasses()
+
+
+def countWords(raw_text):
+    # Fast path: with no control characters and only printable non-ASCII
+    # characters, words are exactly the runs between ASCII whitespace.
+    if ASCII_CONTROL.search(raw_text) is None and (
+        raw_text.isascii()
+        or all(WORD_CLASSES[ord(c)] == "x" for c in set(raw_text) if c > "\x7f")
+    ):
+        return len(raw_text.encode("utf-8").split())
+    classes = raw_text.translate(WORD_CLASSES)
+    return classes.count(" x") + classes.startswith("x")
+
+
+def main():
+    # Read here rather than at import, as export_spans.py and query_spans.py
+    # import this module with arguments of their own.
+    directory = argv[1] if 1 < len(argv) < 4 else "."
+    rate = int(argv[2]) if len(argv) == 3 else 7
+    files = list(filter(lambda x: ".jsonl" in x, os.listdir(directory)))
+
+    # Documents are streamed and only their word counts are kept.
+    doc_lens = defaultdict(list)
+    for file in files:
+        with open(os.path.join(directory, file)) as f:
+            for line in f:
+                doc_lens[file].append(countWords(json.loads(line)["raw_text"]))
+
+    frame = pd.DataFrame(
+        {
+            "file": pd.Categorical(
+                np.repeat(list(doc_lens), [len(lens) for lens in doc_lens.values()]),
+                categories=list(doc_lens),
+            ),
+            "words": np.fromiter(
+                (n for lens in doc_lens.values() for n in lens),
+                dtype=np.int64,
+                count=sum(len(lens) for lens in doc_lens.values()),
+            ),
+        }
+    )
+    # rate per started block of WORDS_PER_UNIT words.
+    frame["price"] = rate * -(-frame["words"] // WORDS_PER_UNIT)
+    totals = frame.groupby("file", sort=False, observed=True).agg(
+        num_docs=("words", "size"),
+        num_words=("words", "sum"),
+        file_total=("price", "sum"),
+    )
+
+    count, total = len(frame), int(frame["price"].sum())
+    print(f"doc lengths: {doc_lens}")
+    print(f"#files: {len(files)}")
+    with open("invoice.csv", "w") as f:
+        for file, group in frame.groupby("file", sort=False, observed=True):
+            f.writelines(file)
+            f.writelines(
+                f"\n{doclen}, {doc_price}"
+                for doclen, doc_price in zip(group["words"].tolist(),
+                                             group["price"].tolist())
+            )
+            num_docs, num_words, file_total = totals.loc[file].tolist()
+            f.writelines(f"\nDocuments: {num_docs}, Words: {num_words}, total: {file_total}\n\n")
+        f.writelines(f"\nGrand Total, {total}")
+
+        print("invoice.csv generated")
+        print(f"#Documents: {count}")
+        print(f"Total: {total}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Answers corpus questions from the Parquet tables export_spans.py writes.
+
+Each query reads only the columns it needs and runs vectorized in Arrow.
+
+    python3 query_spans.py --data export/ tags
+    python3 query_spans.py --data export/ invoice --rate 7
+    python3 query_spans.py --data export/ extents --tag name --limit 100
+"""
+import argparse
+import os
+
+from export_spans import requirePyarrow
+from invoicer import WORDS_PER_UNIT
+
+
+def readTable(data, table, columns, filter=None):
+    requirePyarrow()
+    import pyarrow.dataset as ds
+    dataset = ds.dataset(os.path.join(data, table), format="parquet")
+    # Every file part has its own dictionaries.
+    return dataset.to_table(columns=columns, filter=filter).unify_dictionaries()
+
+
+def tagCounts(data):
+    """(tag, subtype, spans) for every tag and subtype, most frequent first."""
+    table = readTable(data, "spans", ["tag", "subtype"])
+    counts = table.group_by(["tag", "subtype"]).aggregate([("tag", "count")])
+    # Only the small aggregate is sorted, in Python, as Arrow cannot sort
+    # dictionary columns.
+    rows = zip(*(counts.column(name).to_pylist()
+                 for name in ("tag", "subtype", "tag_count")))
+    return sorted(rows, key=lambda row: (-row[2], row[0], row[1] or ""))
+
+
+def invoice(data, rate):
+    """(file, documents, words, total) per file, billed like invoicer.py."""
+    import pyarrow.compute as pc
+    table = readTable(data, "documents", ["file", "words"])
+    # rate per started block of WORDS_PER_UNIT words.
+    units = pc.divide(pc.add(table.column("words"), WORDS_PER_UNIT - 1),
+                      WORDS_PER_UNIT)
+    table = table.append_column("price", pc.multiply(units, rate))
+    totals = table.group_by("file").aggregate(
+        [("words", "count"), ("words", "sum"), ("price", "sum")]
+    )
+    return sorted(zip(*(totals.column(name).to_pylist()
+                        for name in ("file", "words_count", "words_sum",
+                                     "price_sum"))))
+
+
+def extentCounts(data, tag):
+    """(extent, spans) for the distinct extents of tag, most frequent first."""
+    import pyarrow.dataset as ds
+    table = readTable(data, "spans", ["extent"], ds.field("tag") == tag)
+    counts = table.group_by("extent").aggregate([("extent", "count")])
+    counts = counts.sort_by([("extent_count", "descending"),
+                             ("extent", "ascending")])
+    return list(zip(counts.column("extent").to_pylist(),
+                    counts.column("extent_count").to_pylist()))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("query", choices=["tags", "invoice", "extents"])
+    parser.add_argument("--data", required=True,
+                        help="Output directory of export_spans.py")
+    parser.add_argument("--rate", type=int, default=7,
+                        help="Price per started block of words, for invoice")
+    parser.add_argument("--tag", help="Tag whose extents are counted")
+    parser.add_argument("--limit", type=int,
+                        help="Print at most this many rows")
+    args = parser.parse_args()
+
+    if args.query == "tags":
+        for tag, subtype, count in tagCounts(args.data)[:args.limit]:
+            print(f"{count}\t{tag}\t{subtype or ''}")
+    elif args.query == "invoice":
+        rows = invoice(args.data, args.rate)
+        for file, documents, words, total in rows[:args.limit]:
+            print(f"{file}\tDocuments: {documents}, Words: {words}, total: {total}")
+        print(f"Grand Total, {sum(row[3] for row in rows)}")
+    else:
+        if not args.tag:
+            parser.error("extents needs --tag")
+        for extent, count in extentCounts(args.data, args.tag.upper())[:args.limit]:
+            print(f"{count}\t{extent}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+import json
+import random
+import re
+
+import pytest
+
+import autoannotate
+from autoannotate import (
+    COUNTRY_NAMES, DETECTORS_BY_NAME, GENDER_WORDS, STATE_NAMES,
+    USERNAME_WORDS, EmailFinder, Merge, PatternFinder, Span, annotateLine,
+    autoArbitrate, digitWindows, encodeAnnotations, findSpans,
+    getBasicAnnotations, mergeLine,
+)
+
+SEPARATORS = [" ", " ", "  ", "\n", "\t", ", ", ".", "-", "'", "_", "",
+              "\xa0", "é", "1", "(", ")"]
+
+
+def fuzz(pieces, seed, count=300, length=12):
+    # Texts of random pieces in random case, some cut short, between
+    # separators that may or may not break words.
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(count):
+        parts = []
+        for _ in range(rng.randint(1, length)):
+            piece = rng.choice(pieces)
+            if rng.random() < 0.3:
+                piece = piece.upper() if rng.random() < 0.5 else piece.title()
+            if rng.random() < 0.2:
+                cut = rng.randint(0, len(piece))
+                piece = piece[:cut] if rng.random() < 0.5 else piece[cut:]
+            parts.append(piece)
+            parts.append(rng.choice(SEPARATORS))
+        texts.append("".join(parts))
+    return texts
+
+
+def regex_spans(patterns, text):
+    return sorted(m.span() for p in patterns
+                  for m in re.finditer(p, text, flags=re.IGNORECASE))
+
+
+def span(start, end, tag):
+    return {"start": start, "end": end, "tag": tag, "extent": "x" * (end - start)}
+
+
+def test_absent_keeps_agreed_spans_inside_detector_span():
+    name = span(15, 20, "NAME")
+    prepared = ([name], [span(10, 30, "DATE-TIME")], [dict(name)])
+    canon, conflicts, settled = autoArbitrate(None, ["agree", "absent"],
+                                              prepared)
+    assert canon == [name]
+    assert conflicts == []
+    assert settled == {"agree": 1, "absent": 1}
+
+
+def test_detector_only_span_is_a_conflict_by_default():
+    name = span(40, 45, "NAME")
+    detected = span(10, 30, "DATE-TIME")
+    prepared = ([name], [detected, dict(name)], [dict(name)])
+    canon, conflicts, settled = autoArbitrate(None, ["agree", "majority"],
+                                              prepared)
+    assert canon == [name]
+    assert conflicts == [{"annotations": None, "auto": detected,
+                          "annotations_v2": None}]
+    assert settled == {"agree": 1}
+
+
+def test_large_document_keeps_its_spans_under_the_default_budget():
+    sentence = ("Met David Miller on 12 March 2021 in Texas, India; mail "
+                "david.miller@example.com or see www.example.com/profile, "
+                "he is male, call 987-654-3210. ")
+    raw_txt = sentence * (3_000_000 // len(sentence))
+    spans, timed_out = findSpans(raw_txt)
+    assert timed_out == []
+    tags = {span.detector.name for span in spans}
+    assert {"NAME", "DATE", "EMAIL", "URL", "GENDER", "COUNTRY", "STATE",
+            "PHONE"} <= tags
+
+
+@pytest.mark.parametrize("keep", [0.5, 0.95])
+def test_unreadable_names_dict_falls_back_to_names_file(tmp_path, monkeypatch, keep):
+    with open(autoannotate.NAMES_ARTIFACT, "rb") as f:
+        artifact = f.read()
+    truncated = tmp_path / "names.dict"
+    truncated.write_bytes(artifact[:int(len(artifact) * keep)])
+    monkeypatch.setattr(autoannotate, "NAMES_ARTIFACT", str(truncated))
+    with pytest.warns(UserWarning, match="corrupt dictionary artifact"):
+        matcher = autoannotate.loadNameMatcher()
+    assert matcher.findall("Met David Miller")
+
+
+def test_merge_keeps_timed_out_unless_the_whole_document_is_rescanned(tmp_path):
+    document = {"id": 1, "raw_text": "Met David on 12 March 2021",
+                "annotations": {"named_entity": [], "timed_out": ["URL"]}}
+    previous = tmp_path / "previous.jsonl"
+    previous.write_text(json.dumps(document) + "\n")
+    edited = dict(document, raw_text=document["raw_text"] + " in Texas")
+    for doc in (document, edited):
+        merged = json.loads(mergeLine(json.dumps(doc), 1, Merge(str(previous), 8)))
+        assert merged["annotations"]["timed_out"] == ["URL"]
+    autoannotate._previous_indexes.pop(str(previous)).close()
+    merged = json.loads(mergeLine(json.dumps(document), 1, Merge(None, 8)))
+    assert "timed_out" not in merged["annotations"]
+
+
+@pytest.mark.parametrize("name, words, pattern", [
+    ("GENDER", GENDER_WORDS, r"\b{}\b"),
+    ("USERNAME", USERNAME_WORDS, r"\b{}\b"),
+    ("STATE", STATE_NAMES, r"\b{}"),
+])
+def test_dictionary_detector_matches_its_word_regexes(name, words, pattern):
+    patterns = [pattern.format(re.escape(word)) for word in words]
+    for text in fuzz(words, seed=len(name)):
+        assert sorted(DETECTORS_BY_NAME[name].find(text)) == \
+            regex_spans(patterns, text), text
+
+
+def test_country_matcher_matches_its_word_regexes():
+    patterns = [r"\b{}\b".format(re.escape(name).replace(r"\ ", r"\s"))
+                for name in COUNTRY_NAMES]
+    for text in fuzz(COUNTRY_NAMES, seed=1):
+        assert sorted(s[:2] for s in autoannotate._matcher("COUNTRY").findall(text)) \
+            == regex_spans(patterns, text), text
+
+
+def test_name_matcher_matches_the_name_regex():
+    # The regex create_name_regex.py used to write: every name, longest
+    # first, as one alternation.
+    words = autoannotate._matcher("NAME").words
+    pattern = re.compile("|".join(r"\b" + re.escape(word) + r"\b"
+                                  for word in words), flags=re.IGNORECASE)
+    pieces = words[::7] + [word.split()[0] for word in words[::11]]
+    for text in fuzz(pieces, seed=2, count=200):
+        assert DETECTORS_BY_NAME["NAME"].find(text) == \
+            [m.span() for m in pattern.finditer(text)], text
+
+
+DATE_PIECES = ["12", "3", "31", "2021", "1999", "10:30", "7:05:59", "am", "pm",
+               "a.m.", "Monday", "mon", "tues", "March", "mar", "Sept", "dec",
+               "to", "and", "the", "of", "on", "at", "1st", "th", "/", "-",
+               "1614556800000", "x", "o'clock"]
+
+
+@pytest.mark.parametrize("name", ["TIME", "DATE"])
+def test_digit_windows_give_the_matches_of_a_full_scan(name):
+    windowed = DETECTORS_BY_NAME[name].find
+    full = PatternFinder(*windowed.patterns)
+    for text in fuzz(DATE_PIECES, seed=3, count=500, length=16):
+        windows = digitWindows(text)
+        assert sorted(windowed(text, None, windows)) == sorted(full(text)), text
+
+
+EMAIL_REGEX = r"\b[a-zA-Z0-9+_.-]+@[a-zA-Z]+\.[a-zA-Z]+\b"
+EMAIL_PIECES = ["a", "Bob", "x1", "+", "_", ".", "-", "@", "@@", "com", ".org",
+                "@mail.com", "@x.io", "@b.c.d", "bob@ex.org", "é", "日本",
+                "a" * 70, "a.b-" * 40, "9", "/", ":"]
+
+
+def test_email_finder_matches_the_email_regex():
+    find = EmailFinder()
+    for text in fuzz(EMAIL_PIECES, seed=5, count=500, length=14):
+        assert sorted(find(text)) == regex_spans([EMAIL_REGEX], text), text
+
+
+@pytest.mark.parametrize("document", [
+    {"raw_text": "Call John Smith at 555-123-4567 on March 3rd, 2021."},
+    {"raw_text": "José met Zoë on 12/03/2021 at 10:30 pm in Austin, Texas"},
+    {"id": 7, "raw_text": "Zoë Müller <zoe@example.de> 🎉\n\t\"quoted\" \\ \u2028",
+     "meta": {"tags": ["a", "é"], "score": 1.5, "ok": None}},
+    {"raw_text": "Mail 日本 at bob@example.com", "annotations": {"stale": True},
+     "after": [1, 2]},
+    {"raw_text": ""},
+])
+def test_annotate_line_matches_json_dumps(document):
+    expected = json.dumps(
+        dict(document, annotations=getBasicAnnotations(document["raw_text"]))
+    ) + "\n"
+    assert annotateLine(json.dumps(document)) == expected
+
+
+def test_encoded_annotations_match_json_dumps_with_timed_out():
+    raw_txt = "Zoë 🎉 \"Müller\" in Texas, 12/03/2021"
+    spans = [Span(0, 3, DETECTORS_BY_NAME["NAME"]),
+             Span(4, 14, DETECTORS_BY_NAME["USERNAME"]),
+             Span(18, 23, DETECTORS_BY_NAME["STATE"]),
+             Span(25, 35, DETECTORS_BY_NAME["DATE"])]
+    timed_out = ["URL", "NAME"]
+    expected = {"named_entity": [span.toDict(raw_txt) for span in spans],
+                "timed_out": timed_out}
+    assert encodeAnnotations(spans, timed_out, raw_txt) == json.dumps(expected)
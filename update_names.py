@@ -1,27 +1,135 @@
-import json
 import os
-import re
 import argparse
 
+from create_name_regex import NAMES_ARTIFACT, writeArtifact
+from dictionary_matcher import normalizeWord
+
+
+def nameKey(name):
+    # The order loadWordList returns, longest names first.
+    return (-len(name), name)
+
+
+def readNames(path):
+    with open(path, 'r') as f:
+        return [name for name in map(normalizeWord, f) if name]
+
+
+def loadBase(path):
+    """Normalized names of the base file in nameKey order.
+
+    A base written by this script already is, so it is only re-sorted when it
+    was edited by hand.
+    """
+    names = readNames(path)
+    keys = list(map(nameKey, names))
+    if all(a < b for a, b in zip(keys, keys[1:])):
+        return names
+    return sorted(set(names), key=nameKey)
+
+
+def mergeNames(base, new):
+    """The sorted `base` with the names of `new` it misses merged in, and
+    those names.
+
+    Only `new` is sorted; base is walked once alongside it.
+    """
+    merged, added = [], []
+    i = 0
+    for name in sorted(set(new), key=nameKey):
+        key = nameKey(name)
+        while i < len(base) and nameKey(base[i]) < key:
+            merged.append(base[i])
+            i += 1
+        if i < len(base) and base[i] == name:
+            continue
+        merged.append(name)
+        added.append(name)
+    merged.extend(base[i:])
+    return merged, added
+
+
+def writeNames(names, path):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        f.write('\n'.join(names))
+    os.replace(tmp_path, path)
+
+
+def editDistance(a, b, limit):
+    """Levenshtein distance of a and b, or limit + 1 once it exceeds limit."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1,
+                               previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def deletions(name, count):
+    """Every string left after deleting at most `count` characters of name."""
+    variants = {name}
+    frontier = {name}
+    for _ in range(count):
+        frontier = {v[:i] + v[i + 1:] for v in frontier for i in range(len(v))}
+        variants |= frontier
+    return variants
+
+
+def nearDuplicates(names, max_distance=1):
+    """(distance, name, other) for every pair of names within max_distance.
+
+    Names within k edits share a string left after at most k deletions from
+    each, so names are bucketed by those and only bucket mates are compared.
+    """
+    buckets = {}
+    pairs = []
+    for name in names:
+        variants = deletions(name, max_distance)
+        candidates = set()
+        for variant in variants:
+            candidates.update(buckets.get(variant, ()))
+        for other in candidates:
+            distance = editDistance(other, name, max_distance)
+            if distance <= max_distance:
+                pairs.append((distance, other, name))
+        for variant in variants:
+            buckets.setdefault(variant, []).append(name)
+    return sorted(pairs)
+
+
 if __name__ == '__main__':
     ap = argparse.ArgumentParser()
     ap.add_argument("--base", required=True, help="Input file path")
     ap.add_argument("--new", required=True, help="Input file path")
+    ap.add_argument("--output", default=NAMES_ARTIFACT,
+                    help="Compiled name dictionary path")
+    ap.add_argument("--near-duplicates", action="store_true",
+                    help="Report names within --max-distance edits of another")
+    ap.add_argument("--max-distance", type=int, default=1,
+                    help="Edit distance reported as a near duplicate")
+    ap.add_argument("--report", help="Write the near duplicates here instead "
+                                     "of printing them")
     av = ap.parse_args()
 
-    content = []
-
-    with open(av.base, 'r') as f:
-        content.extend(list(map(lambda x: x.lower(),f.read().split('\n'))))
-    with open(av.new, 'r') as f:
-        content.extend(list(map(lambda x: x.lower(),f.read().split('\n'))))
-
-    name_list = sorted(list(set(content)),key=len,reverse=True)
+    name_list = loadBase(av.base)
+    name_list, added = mergeNames(name_list, readNames(av.new))
+    writeNames(name_list, av.base)
+    writeArtifact(name_list, av.base, av.output)
+    print(f"{len(added)} names added, {len(name_list)} in {av.base}")
 
-    with open(av.base,'w') as f:
-        outstr = []
-        for word in name_list:
-            if len(word)==0:
-                continue
-            outstr.append(word.strip())
-        f.write('\n'.join(outstr))
\ No newline at end of file
+    if av.near_duplicates:
+        lines = [f"{distance}\t{name}\t{other}" for distance, name, other
+                 in nearDuplicates(name_list, av.max_distance)]
+        if av.report:
+            with open(av.report, 'w') as f:
+                f.write(''.join(line + '\n' for line in lines))
+            print(f"{len(lines)} near duplicates written to {av.report}")
+        else:
+            print('\n'.join(lines))